@@ -0,0 +1,168 @@
+"""Admin panel: price tables, USD rate, PDF colour and backgrounds, diagnostics.
+
+app.py only calls render_admin() while the admin tab is open, so none of
+these tables, settings reads or directory scans run on manager reruns.
+"""
+import streamlit as st
+import pandas as pd
+from pathlib import Path
+import shutil
+import instrumentation
+from database import execute_write, read_conn, save_table_edits, usd_rate_history, normalize_text_color
+from backgrounds import BACKGROUNDS_DIR, list_background_files
+from rates import get_rate_provider
+
+
+def render_admin(render_queue):
+    st.header("Адмін панель")
+
+    def editable_table(title, table):
+        st.subheader(title)
+        with read_conn() as conn:
+            df = pd.read_sql(f"SELECT * FROM {table}", conn)
+        edited = st.data_editor(df, width="stretch", num_rows="fixed")
+        if st.button(f"Зберегти {table}"):
+            changed = save_table_edits(
+                table,
+                list(df.columns),
+                df.to_dict("split")["data"],
+                edited.to_dict("split")["data"],
+            )
+            st.success(f"Збережено змін: {changed}")
+
+    editable_table("Метали ₴/г","metals")
+    editable_table("Робота ювеліра ₴/г","jeweler")
+    editable_table("Каміння (USD матриця)","stones")
+    editable_table("Профілі","profiles")
+    editable_table("Гравіювання","engravings")
+    editable_table("Покриття","coatings")
+
+    st.subheader("Курс USD")
+
+    with read_conn() as conn:
+        settings = pd.read_sql("SELECT usd, background_file, text_color FROM settings WHERE id=1",conn).iloc[0]
+    usd = settings["usd"]
+    text_color = settings["text_color"]
+    new_usd = st.number_input("USD → UAH",value=float(usd))
+
+    if st.button("Зберегти курс"):
+        # an override of the catalog rate only: the dated history keeps the rates from the source
+        execute_write("UPDATE settings SET usd=? WHERE id=1", (float(new_usd),))
+        st.success(f"Курс оновлено: {float(new_usd)}")
+
+    if st.button("Оновити з НБУ"):
+        # force: a rate cached before a manual edit must still be fetched and applied again
+        st.session_state["usd_refresh"] = get_rate_provider().refresh(force=True)
+
+    def usd_refresh_status():
+        usd_refresh = st.session_state.get("usd_refresh")
+        if usd_refresh is None:
+            return
+        if not usd_refresh.done():
+            st.info("Курс НБУ оновлюється у фоні…")
+            return
+        del st.session_state["usd_refresh"]
+        if usd_refresh.exception() is not None:
+            st.session_state["usd_refresh_result"] = ("error", f"Не вдалося оновити курс: {usd_refresh.exception()}")
+        else:
+            rate = usd_refresh.result()
+            st.session_state["usd_refresh_result"] = ("success", f"Оновлено: {rate.rate} ({rate.date})")
+        # a full rerun, so the USD field above shows the new rate
+        st.rerun()
+
+    # polls once a second only while a request is in flight
+    st.fragment(usd_refresh_status, run_every=1 if "usd_refresh" in st.session_state else None)()
+    usd_refresh_result = st.session_state.pop("usd_refresh_result", None)
+    if usd_refresh_result is not None:
+        kind, message = usd_refresh_result
+        getattr(st, kind)(message)
+
+    with st.expander("Історія курсу"):
+        st.dataframe(pd.DataFrame(usd_rate_history()), hide_index=True)
+
+
+    st.subheader("Колір тексту та ліній у PDF")
+    new_text_color = st.text_input(
+        "Колір у форматі HEX (#rgb або #rrggbb)",
+        value=text_color,
+        max_chars=7,
+        help="Наприклад: #fff, #000, #c4a, #ffffff, #1f2937",
+    )
+
+    if st.button("Зберегти колір"):
+        normalized_color = normalize_text_color(new_text_color)
+        if normalized_color != new_text_color.strip().lower():
+            st.error("Некоректний формат. Використовуйте HEX: #rgb або #rrggbb (наприклад #fff чи #ffffff).")
+        else:
+            execute_write("UPDATE settings SET text_color=? WHERE id=1", (normalized_color,))
+            st.success(f"Колір оновлено: {normalized_color}")
+
+    st.subheader("Фони для PDF")
+
+    uploaded_backgrounds = st.file_uploader(
+        "Завантажити фони (PNG/JPG)",
+        type=["png", "jpg", "jpeg"],
+        accept_multiple_files=True,
+        key="background_uploads",
+    )
+
+    if st.button("Зберегти фони"):
+        if uploaded_backgrounds:
+            from pdf_engine import forget_background
+
+            saved = 0
+            for bg in uploaded_backgrounds:
+                safe_name = Path(bg.name).name
+                target = BACKGROUNDS_DIR / safe_name
+                with target.open("wb") as f:
+                    shutil.copyfileobj(bg, f)
+                forget_background(str(target))
+                saved += 1
+            st.success(f"Збережено фонів: {saved}")
+        else:
+            st.info("Спочатку оберіть хоча б один файл.")
+
+    backgrounds = list_background_files()
+    current_background = settings["background_file"]
+    if current_background not in backgrounds:
+        current_background = backgrounds[0] if backgrounds else "full_white.png"
+
+    selected_background = st.selectbox(
+        "Фон для формування PDF",
+        options=backgrounds if backgrounds else ["full_white.png"],
+        index=(backgrounds.index(current_background) if backgrounds else 0),
+        key="selected_background",
+    )
+
+    if st.button("Зберегти фон для PDF"):
+        execute_write("UPDATE settings SET background_file=? WHERE id=1", (selected_background,))
+        st.success(f"Активний фон: {selected_background}")
+
+    with st.expander("🩺 Діагностика"):
+        st.markdown("#### Черга PDF")
+        st.json(render_queue.metrics())
+
+        trace_on = st.toggle(
+            "Вимірювати час виконання (для всіх сесій)",
+            value=instrumentation.is_enabled(),
+            key="instrumentation",
+        )
+        if trace_on != instrumentation.is_enabled():
+            instrumentation.set_enabled(trace_on)
+
+        if trace_on:
+            diagnostics = instrumentation.stats()
+            if diagnostics["spans"]:
+                st.dataframe(pd.DataFrame(diagnostics["spans"]), width="stretch", hide_index=True)
+            else:
+                st.info("Ще немає вимірів: виконайте кілька дій у вкладці «Менеджер».")
+            if diagnostics["counters"]:
+                st.json(diagnostics["counters"])
+
+            slow_queries = [e for e in diagnostics["events"] if e["event"] == "slow_query"]
+            if slow_queries:
+                st.markdown(f"#### Повільні запити (≥ {instrumentation.SLOW_QUERY_MS:.0f} мс)")
+                st.dataframe(pd.DataFrame(slow_queries), width="stretch", hide_index=True)
+
+            if st.button("Скинути виміри"):
+                instrumentation.reset()
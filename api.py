@@ -0,0 +1,288 @@
+"""Headless quote and PDF API, independent of the Streamlit script.
+
+    python api.py --port 8502 --workers 4
+
+    GET  /health    liveness and the catalog version
+    GET  /catalog   the options a quote may use
+    POST /quote     JSON record -> priced rows and totals
+    POST /pdf       JSON record -> application/pdf (?save=1 also stores it in history)
+
+Request bodies use the batch_pdf record format: ``w_*``/``m_*`` RingConfig
+fields (``w_metal``, ``w_weight``, ``w_stone_type`` ...), the ring sizes and
+the contract fields. Photos travel as base64 in ``photo1``/``photo2``; file
+paths are not accepted, and ``background_file`` must name one of the files
+in assets/backgrounds. Requests are handled by a fixed pool of worker
+threads; when the pool and its queue are full the server answers 503 at
+once instead of piling up connections.
+"""
+import argparse
+import base64
+import binascii
+import json
+import socket
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlsplit
+
+import instrumentation
+from backgrounds import list_background_files
+from batch_pdf import build_payload, ring_config
+from database import STONE_SIZES, STONE_TYPES, get_catalog, init_db, save_quote
+from pricing import price_ring
+
+DEFAULT_PORT = 8502
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE = 32
+MAX_BODY_BYTES = 20 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+# a stalled client must not hold a worker forever
+SOCKET_TIMEOUT = 10
+# rejected connections being answered with 503; beyond this they are just closed
+MAX_PENDING_REJECTS = 64
+REJECT_RESPONSE = (
+    b"HTTP/1.1 503 Service Unavailable\r\n"
+    b"Retry-After: 1\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+)
+
+
+class BadRequest(Exception):
+    pass
+
+
+def _decode_photo(value):
+    if not value:
+        return None
+    try:
+        return BytesIO(base64.b64decode(value, validate=True))
+    except (binascii.Error, TypeError, ValueError) as exc:
+        raise BadRequest(f"photo is not valid base64: {exc}")
+
+
+def _record(body):
+    try:
+        record = json.loads(body or b"{}")
+    except ValueError as exc:
+        raise BadRequest(f"invalid JSON: {exc}")
+    if not isinstance(record, dict):
+        raise BadRequest("body must be a JSON object")
+    return record
+
+
+def quote_response(record):
+    catalog = get_catalog()
+    rings = {}
+    try:
+        for prefix in ("w", "m"):
+            quote = price_ring(ring_config(record, prefix), catalog)
+            rings[prefix] = {
+                "total": quote.total,
+                "rows": quote.pricing_rows(),
+                "lines": [asdict(line) for line in quote.lines],
+            }
+    except (KeyError, TypeError, ValueError) as exc:
+        raise BadRequest(f"cannot price the record: {type(exc).__name__}: {exc}")
+    return {
+        "catalog_version": catalog.version,
+        "usd": catalog.usd,
+        "w": rings["w"],
+        "m": rings["m"],
+        "pair_total": rings["w"]["total"] + rings["m"]["total"],
+    }
+
+
+def pdf_payload(record):
+    photos = {key: _decode_photo(record.pop(key, None)) for key in ("photo1", "photo2")}
+    background_file = record.get("background_file")
+    # only a file listed in assets/backgrounds; never a path, "..", or the directory itself
+    if background_file and background_file not in list_background_files():
+        raise BadRequest(f"unknown background_file {background_file!r}")
+    try:
+        data = build_payload(record, get_catalog())
+    except (KeyError, TypeError, ValueError) as exc:
+        raise BadRequest(f"cannot build the quote: {type(exc).__name__}: {exc}")
+    data.update(photos)
+    return data
+
+
+def catalog_response():
+    catalog = get_catalog()
+    return {
+        "version": catalog.version,
+        "usd": catalog.usd,
+        "metals": dict(catalog.metals),
+        "jeweler_types": dict(catalog.jeweler),
+        "stone_types": STONE_TYPES,
+        "stone_sizes": STONE_SIZES,
+        "profiles": dict(catalog.profiles),
+        "engravings": dict(catalog.engravings),
+        "coatings": dict(catalog.coatings),
+        "background_file": catalog.background_file,
+        "text_color": catalog.text_color,
+    }
+
+
+class QuoteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "KoshtorysAPI/1"
+    timeout = SOCKET_TIMEOUT
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, content_type, body, extra_headers=()):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Connection", "close")
+        for name, value in extra_headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.close_connection = True
+        # stream in chunks so a slow client never needs a second copy of the body
+        view = memoryview(body)
+        for start in range(0, len(view), CHUNK_SIZE):
+            self.wfile.write(view[start:start + CHUNK_SIZE])
+
+    def _json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send(status, "application/json; charset=utf-8", body)
+
+    def _body(self):
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise BadRequest("Content-Length is not an integer")
+        if length < 0:
+            raise BadRequest("Content-Length is negative")
+        if length > MAX_BODY_BYTES:
+            raise BadRequest(f"body larger than {MAX_BODY_BYTES} bytes")
+        return self.rfile.read(length)
+
+    def _dispatch(self, routes):
+        url = urlsplit(self.path)
+        route = routes.get(url.path)
+        if route is None:
+            self._json(404, {"error": f"no route {self.command} {url.path}"})
+            return
+        try:
+            with instrumentation.span(f"api.{url.path.strip('/')}"):
+                route(parse_qs(url.query))
+        except BadRequest as exc:
+            instrumentation.count("api.bad_requests")
+            self._json(400, {"error": str(exc)})
+        except Exception as exc:
+            instrumentation.count("api.errors")
+            self.log_error("%s %s failed: %r", self.command, url.path, exc)
+            self._json(500, {"error": f"{type(exc).__name__}: {exc}"})
+
+    def do_GET(self):
+        self._dispatch({
+            "/health": lambda query: self._json(200, {"status": "ok", "catalog_version": get_catalog().version}),
+            "/catalog": lambda query: self._json(200, catalog_response()),
+        })
+
+    def do_POST(self):
+        self._dispatch({
+            "/quote": lambda query: self._json(200, quote_response(_record(self._body()))),
+            "/pdf": self._pdf,
+        })
+
+    def _pdf(self, query):
+        # reportlab and the fonts are only loaded once the first PDF is asked for
+        from pdf_engine import generate_pdf
+
+        data = pdf_payload(_record(self._body()))
+        pdf_bytes = generate_pdf(data)
+        headers = [("Content-Disposition", 'attachment; filename="koshtorys.pdf"')]
+        if query.get("save") == ["1"]:
+            headers.append(("X-Quote-Id", str(save_quote(data, pdf_bytes))))
+        self._send(200, "application/pdf", pdf_bytes, headers)
+
+
+class QuoteServer(HTTPServer):
+    """HTTPServer that hands connections to a fixed worker pool with a bounded queue."""
+
+    # the kernel backlog only has to absorb bursts until accept() hands them on
+    request_queue_size = 128
+
+    def __init__(self, address, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE, verbose=False):
+        super().__init__(address, QuoteHandler)
+        self.verbose = verbose
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="api")
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._rejector = ThreadPoolExecutor(max_workers=1, thread_name_prefix="api-reject")
+        self._reject_slots = threading.BoundedSemaphore(MAX_PENDING_REJECTS)
+
+    def process_request(self, request, client_address):
+        if self._slots.acquire(blocking=False):
+            self._pool.submit(self._process, request, client_address)
+            return
+
+        instrumentation.count("api.rejected")
+        if self._reject_slots.acquire(blocking=False):
+            self._rejector.submit(self._reject, request)
+        else:
+            self.shutdown_request(request)
+
+    def _reject(self, request):
+        # closing with the request still unread would reset the connection and the
+        # client would never see the 503, so drain what it sends first
+        try:
+            request.settimeout(1)
+            request.sendall(REJECT_RESPONSE)
+            request.shutdown(socket.SHUT_WR)
+            received = 0
+            while received < MAX_BODY_BYTES:
+                chunk = request.recv(CHUNK_SIZE)
+                if not chunk:
+                    break
+                received += len(chunk)
+        except OSError:
+            pass
+        finally:
+            request.close()
+            self._reject_slots.release()
+
+    def _process(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=True)
+        self._rejector.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS, help="request worker threads")
+    parser.add_argument("--queue", type=int, default=DEFAULT_QUEUE, help="accepted connections waiting for a worker")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    init_db()
+    server = QuoteServer((args.host, args.port), args.workers, args.queue, args.verbose)
+    print(f"serving on http://{args.host}:{server.server_port} ({args.workers} workers, queue {args.queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,166 +1,66 @@
 import streamlit as st
 import pandas as pd
-import requests
-from pathlib import Path
-import shutil
-from database import get_conn, init_db, STONE_SIZES, STONE_TYPES, normalize_text_color
-from pdf_engine import generate_pdf
+import instrumentation
+from admin import render_admin
+from database import init_db, save_quote, search_quotes, get_quote, get_quote_pdf, get_catalog, STONE_SIZES, STONE_TYPES
+from backgrounds import BACKGROUNDS_DIR, get_background_path
+from pricing import RingConfig, Variant, comparison_rows, price_grid, price_ring, weight_range
+from pdf_jobs import DONE, FAILED, QUEUED, QueueFull, get_render_queue
 
 
 init_db()
-conn = get_conn()
 
-ASSETS_DIR = Path("assets")
-BACKGROUNDS_DIR = ASSETS_DIR / "backgrounds"
 BACKGROUNDS_DIR.mkdir(parents=True, exist_ok=True)
+# worker processes start once per server and keep fonts and the active background loaded
+render_queue = get_render_queue([get_background_path(get_catalog().background_file)])
 DASHBOARD_URL = "https://panel-for-manager-call.streamlit.app/"
-
-
-def list_background_files():
-    allowed = {".png", ".jpg", ".jpeg"}
-    files = sorted([f.name for f in BACKGROUNDS_DIR.iterdir() if f.is_file() and f.suffix.lower() in allowed])
-
-
-    return files
-
-
-def get_background_path(filename):
-    candidate = BACKGROUNDS_DIR / filename
-    if candidate.exists():
-        return str(candidate)
-
-    fallback = BACKGROUNDS_DIR / "full_white.png"
-    if fallback.exists():
-        return str(fallback)
-
-    return "background.png"
+# rows of the price sheet; with 5 metals x 3 work types that is 15 000 prices
+MAX_SHEET_WEIGHTS = 1000
+# columns of the comparison PDF that still fit an A4 page
+MAX_VARIANTS = 4
 
 st.set_page_config(layout="wide")
 st.link_button("⬅ Назад до панелі менеджера", DASHBOARD_URL)
 st.divider()
 st.title("💍 Кошторис обручок")
 
-tab1, tab2 = st.tabs(["Менеджер","Адмін"])
+tab1, tab2 = st.tabs(["Менеджер","Адмін"], key="tab", on_change="rerun")
 
 # ================= ADMIN =================
-with tab2:
-
-    st.header("Адмін панель")
+# the admin panel, with its tables and settings reads, only runs while its tab is open
+if tab2.open:
+    with tab2, instrumentation.span("rerun.admin"):
+        render_admin(render_queue)
 
-    def editable_table(title, table):
-        st.subheader(title)
-        df = pd.read_sql(f"SELECT * FROM {table}", conn)
-        edited = st.data_editor(df, use_container_width=True, num_rows="fixed")
-        if st.button(f"Зберегти {table}"):
-            for _, r in edited.iterrows():
-                cols = ",".join([f"{c}=?" for c in df.columns[1:]])
-                conn.execute(
-                    f"UPDATE {table} SET {cols} WHERE {df.columns[0]}=?",
-                    list(r[1:]) + [r[0]]
-                )
-            conn.commit()
-            st.success("Збережено")
-
-    editable_table("Метали ₴/г","metals")
-    editable_table("Робота ювеліра ₴/г","jeweler")
-    editable_table("Каміння (USD матриця)","stones")
-    editable_table("Профілі","profiles")
-    editable_table("Гравіювання","engravings")
-    editable_table("Покриття","coatings")
-
-    st.subheader("Курс USD")
-
-    settings = pd.read_sql("SELECT usd, background_file, text_color FROM settings WHERE id=1",conn).iloc[0]
-    usd = settings["usd"]
-    text_color = settings["text_color"]
-    new_usd = st.number_input("USD → UAH",value=float(usd))
-
-    if st.button("Зберегти курс"):
-        conn.execute("UPDATE settings SET usd=? WHERE id=1",(new_usd,))
-        conn.commit()
-
-    if st.button("Оновити з НБУ"):
-        r = requests.get("https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?valcode=USD&json")
-        rate = r.json()[0]["rate"]
-        conn.execute("UPDATE settings SET usd=? WHERE id=1",(rate,))
-        conn.commit()
-        st.success(f"Оновлено: {rate}")
-
-
-    st.subheader("Колір тексту та ліній у PDF")
-    new_text_color = st.text_input(
-        "Колір у форматі HEX (#rgb або #rrggbb)",
-        value=text_color,
-        max_chars=7,
-        help="Наприклад: #fff, #000, #c4a, #ffffff, #1f2937",
-    )
-
-    if st.button("Зберегти колір"):
-        normalized_color = normalize_text_color(new_text_color)
-        if normalized_color != new_text_color.strip().lower():
-            st.error("Некоректний формат. Використовуйте HEX: #rgb або #rrggbb (наприклад #fff чи #ffffff).")
-        else:
-            conn.execute("UPDATE settings SET text_color=? WHERE id=1", (normalized_color,))
-            conn.commit()
-            st.success(f"Колір оновлено: {normalized_color}")
-
-    st.subheader("Фони для PDF")
-
-    uploaded_backgrounds = st.file_uploader(
-        "Завантажити фони (PNG/JPG)",
-        type=["png", "jpg", "jpeg"],
-        accept_multiple_files=True,
-        key="background_uploads",
-    )
-
-    if st.button("Зберегти фони"):
-        if uploaded_backgrounds:
-            saved = 0
-            for bg in uploaded_backgrounds:
-                safe_name = Path(bg.name).name
-                target = BACKGROUNDS_DIR / safe_name
-                with target.open("wb") as f:
-                    shutil.copyfileobj(bg, f)
-                saved += 1
-            st.success(f"Збережено фонів: {saved}")
-        else:
-            st.info("Спочатку оберіть хоча б один файл.")
-
-    backgrounds = list_background_files()
-    current_background = pd.read_sql("SELECT background_file FROM settings WHERE id=1", conn).iloc[0]["background_file"]
-    if current_background not in backgrounds:
-        current_background = backgrounds[0] if backgrounds else "full_white.png"
+# ================= MANAGER =================
+with tab1, instrumentation.span("rerun.manager"):
 
-    selected_background = st.selectbox(
-        "Фон для формування PDF",
-        options=backgrounds if backgrounds else ["full_white.png"],
-        index=(backgrounds.index(current_background) if backgrounds else 0),
-        key="selected_background",
-    )
+    catalog = get_catalog()
 
-    if st.button("Зберегти фон для PDF"):
-        conn.execute("UPDATE settings SET background_file=? WHERE id=1", (selected_background,))
-        conn.commit()
-        st.success(f"Активний фон: {selected_background}")
+    col1,col2 = st.columns(2)
 
-# ================= MANAGER =================
-with tab1:
+    # The rings, the photos and the contract data are fragments: a widget inside
+    # one reruns only that block (a ring also redraws the pair total), not the
+    # whole script with the admin tab and its queries. What the other blocks
+    # need from them is kept in st.session_state under the widget keys and
+    # ring_w / ring_m.
+    @st.fragment
+    def photos_section():
+        st.file_uploader("Фото жіночої",type=["png","jpg"],key="p1")
+        st.file_uploader("Фото чоловічої",type=["png","jpg"],key="p2")
 
-    metals = pd.read_sql("SELECT * FROM metals",conn)
-    jeweler = pd.read_sql("SELECT * FROM jeweler",conn)
-    stones = pd.read_sql("SELECT * FROM stones",conn)
-    profiles = pd.read_sql("SELECT * FROM profiles",conn)
-    engr = pd.read_sql("SELECT * FROM engravings",conn)
-    coat = pd.read_sql("SELECT * FROM coatings",conn)
-    settings = pd.read_sql("SELECT usd, background_file, text_color FROM settings WHERE id=1",conn).iloc[0]
-    usd = settings["usd"]
+    photos_section()
 
-    col1,col2 = st.columns(2)
+    st.divider()
+    # claimed here in the full run so that the ring fragments may redraw it
+    pair_total_slot = st.empty()
 
-    photo1 = st.file_uploader("Фото жіночої",type=["png","jpg"],key="p1")
-    photo2 = st.file_uploader("Фото чоловічої",type=["png","jpg"],key="p2")
+    def show_pair_total():
+        rings = [st.session_state.get(f"ring_{prefix}") for prefix in ("w","m")]
+        pair_total = sum(r["total"] for r in rings if r)
+        pair_total_slot.markdown(f"# 🧾 Разом: {pair_total:.2f} ₴")
 
-    def ring(prefix,title):
+    def ring(prefix,title,catalog):
         st.subheader(title)
 
         size = st.text_input("Розмір",key=f"{prefix}s")
@@ -168,11 +68,8 @@ with tab1:
         thickness = st.text_input("Товщина мм",key=f"{prefix}t")
         weight = st.number_input("Вага г",0.0,key=f"{prefix}wg")
 
-        metal = st.selectbox("Метал",metals.name,key=f"{prefix}m")
-        jew = st.selectbox("Тип роботи",jeweler.type,key=f"{prefix}j")
-
-        metal_price = float(metals[metals.name == metal].price.values[0])
-        jeweler_price = float(jeweler[jeweler.type == jew].price.values[0])
+        metal = st.selectbox("Метал",list(catalog.metals),key=f"{prefix}m")
+        jew = st.selectbox("Тип роботи",list(catalog.jeweler),key=f"{prefix}j")
 
         st.markdown("#### Знижки менеджера")
         d1, d2 = st.columns(2)
@@ -210,73 +107,55 @@ with tab1:
                 key=f"{prefix}de",
             )
 
-        pricing_rows = []
-
-        def add_row(category, item, unit_price, qty, discount, unit, discount_type="percent"):
-            base = unit_price * qty
-
-            if discount_type == "per_unit":
-                discounted_unit_price = max(unit_price - discount, 0)
-                final = discounted_unit_price * qty
-                discount_label = f"-{discount:.0f} ₴/{unit}"
-            else:
-                final = base * (1 - discount / 100)
-                discount_label = f"{discount:.0f}%"
-
-            pricing_rows.append(
-                {
-                    "Категорія": category,
-                    "Товар/послуга": item,
-                    "Ціна": f"{unit_price:.0f} ₴",
-                    "К-сть": f"{qty:.2f} {unit}",
-                    "Знижка": discount_label,
-                    "Сума": f"{final:.0f} ₴",
-                }
-            )
-            return final
-
-        total = 0.0
-        total += add_row("Метал", metal, metal_price, weight, metal_discount, "г", "per_unit")
-        total += add_row("Робота ювеліра", jew, jeweler_price, weight, jeweler_discount, "г")
-
+        stone_type = stone_size = profile = engraving = coating = combo = None
+        stone_qty = 0
         stones_txt = profile_txt = engr_txt = coat_txt = combo_txt = ""
 
         if st.checkbox("Каміння",key=f"{prefix}k"):
-            t = st.selectbox("Тип",STONE_TYPES,key=f"{prefix}kt")
-            sz = st.selectbox("Розмір",STONE_SIZES,key=f"{prefix}ks")
-            q = st.number_input("Кількість",0,key=f"{prefix}kq")
-
-            usd_price = stones[stones["size"]==sz][t].values[0]
-            stone_price = float(usd_price * usd)
-            total += add_row("Каміння", f"{t} {sz}мм", stone_price, q, 0.0, "шт")
-            stones_txt = f"{t} {sz}мм x{q}"
+            stone_type = st.selectbox("Тип",STONE_TYPES,key=f"{prefix}kt")
+            stone_size = st.selectbox("Розмір",STONE_SIZES,key=f"{prefix}ks")
+            stone_qty = st.number_input("Кількість",0,key=f"{prefix}kq")
+            stones_txt = f"{stone_type} {stone_size}мм x{stone_qty}"
 
         if st.checkbox("Профіль",key=f"{prefix}p"):
-            p = st.selectbox("Тип",profiles.name,key=f"{prefix}pp")
-            profile_price = float(profiles[profiles.name == p].price.values[0])
-            total += add_row("Профіль", p, profile_price, 1, profile_discount, "шт")
-            profile_txt = p
+            profile = st.selectbox("Тип",list(catalog.profiles),key=f"{prefix}pp")
+            profile_txt = profile
 
         if st.checkbox("Гравіювання",key=f"{prefix}e"):
-            e = st.selectbox("Тип",engr.name,key=f"{prefix}ee")
-            engraving_price = float(engr[engr.name == e].price.values[0])
-            total += add_row("Гравіювання", e, engraving_price, 1, engraving_discount, "шт")
-            engr_txt = e
+            engraving = st.selectbox("Тип",list(catalog.engravings),key=f"{prefix}ee")
+            engr_txt = engraving
 
         if st.checkbox("Покриття",key=f"{prefix}c"):
-            c = st.selectbox("Тип",coat.name,key=f"{prefix}cc")
-            coating_price = float(coat[coat.name == c].price.values[0])
-            total += add_row("Покриття", c, coating_price, 1, 0.0, "шт")
-            coat_txt = c
+            coating = st.selectbox("Тип",list(catalog.coatings),key=f"{prefix}cc")
+            coat_txt = coating
 
         if st.checkbox("Поєднання кольорів",key=f"{prefix}x"):
-            cx = st.number_input("Сума ₴",0.0,key=f"{prefix}xx")
-            total += add_row("Поєднання кольорів", "Додаткова послуга", cx, 1, 0.0, "шт")
-            combo_txt = f"{cx:.0f} ₴"
+            combo = st.number_input("Сума ₴",0.0,key=f"{prefix}xx")
+            combo_txt = f"{combo:.0f} ₴"
+
+        config = RingConfig(
+            metal=metal,
+            jeweler_type=jew,
+            weight=weight,
+            metal_discount=metal_discount,
+            jeweler_discount=jeweler_discount,
+            stone_type=stone_type,
+            stone_size=stone_size,
+            stone_qty=stone_qty,
+            profile=profile,
+            profile_discount=profile_discount,
+            engraving=engraving,
+            engraving_discount=engraving_discount,
+            coating=coating,
+            combo=combo,
+        )
+        quote = price_ring(config, catalog)
+        pricing_rows = quote.pricing_rows()
+        total = quote.total
 
         if pricing_rows:
             st.markdown("#### Ціноутворення")
-            st.dataframe(pd.DataFrame(pricing_rows), use_container_width=True, hide_index=True)
+            st.dataframe(pd.DataFrame(pricing_rows), width="stretch", hide_index=True)
 
         st.markdown(f"### 💰 {total:.2f} ₴")
 
@@ -292,51 +171,61 @@ with tab1:
             "profile":profile_txt,
             "engraving":engr_txt,
             "coating":coat_txt,
-            "combo":combo_txt
+            "combo":combo_txt,
+            "config":config,
         }
 
+    @st.fragment
+    def ring_section(prefix,title):
+        with instrumentation.span("rerun.ring", ring=prefix):
+            # re-read on every fragment rerun: the catalog captured by the last full run may be stale
+            st.session_state[f"ring_{prefix}"] = ring(prefix,title,get_catalog())
+            show_pair_total()
+
+    @st.fragment
+    def contract_section():
+        st.markdown("### Дані для договору")
+        st.markdown(
+            "<p style='font-size:1.05rem; font-weight:700; margin-bottom:0.25rem; font-family:inherit;'>Ім'я нареченого та нареченої</p>",
+            unsafe_allow_html=True,
+        )
+        st.text_input(
+            "Ім'я нареченого та нареченої",
+            label_visibility="collapsed",
+            key="couple_names",
+            placeholder="Наприклад: Іван та Марія",
+        )
+        st.markdown(
+            "<p style='font-size:1.05rem; font-weight:700; margin-bottom:0.25rem; font-family:inherit;'>Номер угоди</p>",
+            unsafe_allow_html=True,
+        )
+        st.text_input(
+            "Номер угоди",
+            label_visibility="collapsed",
+            key="agreement_number",
+            placeholder="Наприклад: WG-2026-015",
+        )
+
+    contract_section()
+
     with col1:
-        woman = ring("w","Жіноча")
+        ring_section("w","Жіноча")
 
     with col2:
-        man = ring("m","Чоловіча")
+        ring_section("m","Чоловіча")
 
+    woman = st.session_state["ring_w"]
+    man = st.session_state["ring_m"]
     pair_total = woman["total"] + man["total"]
 
-    st.divider()
-    st.markdown(f"# 🧾 Разом: {pair_total:.2f} ₴")
-
-    st.markdown("### Дані для договору")
-    st.markdown(
-        "<p style='font-size:1.05rem; font-weight:700; margin-bottom:0.25rem; font-family:inherit;'>Ім'я нареченого та нареченої</p>",
-        unsafe_allow_html=True,
-    )
-    couple_names = st.text_input(
-        "Ім'я нареченого та нареченої",
-        label_visibility="collapsed",
-        key="couple_names",
-        placeholder="Наприклад: Іван та Марія",
-    )
-    st.markdown(
-        "<p style='font-size:1.05rem; font-weight:700; margin-bottom:0.25rem; font-family:inherit;'>Номер угоди</p>",
-        unsafe_allow_html=True,
-    )
-    agreement_number = st.text_input(
-        "Номер угоди",
-        label_visibility="collapsed",
-        key="agreement_number",
-        placeholder="Наприклад: WG-2026-015",
-    )
-
     if st.button("📄 Згенерувати PDF"):
-        latest_settings = pd.read_sql("SELECT background_file, text_color FROM settings WHERE id=1", conn).iloc[0]
-        background_file = latest_settings["background_file"]
+        background_file = catalog.background_file
         background_path = get_background_path(background_file)
-        pdf_text_color = normalize_text_color(latest_settings["text_color"])
+        pdf_text_color = catalog.text_color
 
         data = {
-            "photo1":photo1,
-            "photo2":photo2,
+            "photo1":st.session_state.get("p1"),
+            "photo2":st.session_state.get("p2"),
 
             "w_size":woman["size"],
             "m_size":man["size"],
@@ -365,14 +254,212 @@ with tab1:
             "m_coating":man["coating"],
             "w_combo":woman["combo"],
             "m_combo":man["combo"],
-            "couple_names": couple_names.strip() or None,
-            "agreement_number": agreement_number.strip() or None,
+            "couple_names": st.session_state.get("couple_names","").strip() or None,
+            "agreement_number": st.session_state.get("agreement_number","").strip() or None,
             "text_color": pdf_text_color,
             "background_file": background_file,
             "background_path": background_path,
         }
 
-        out = generate_pdf(data)
+        # rendering happens in the worker pool; the session only polls for the result
+        try:
+            st.session_state["pdf_job"] = render_queue.submit(data, context=catalog)
+        except QueueFull as exc:
+            st.warning(f"Забагато запитів на PDF: {exc}")
+
+    @st.fragment(run_every=1)
+    def pdf_job_progress(job_id):
+        job = render_queue.job(job_id)
+        if job is None or job.state in (DONE, FAILED):
+            # the result is shown by a full rerun of the page
+            st.rerun()
+        if job.state == QUEUED and job.position:
+            st.info(f"⏳ PDF у черзі, перед вами: {job.position}")
+        else:
+            st.info("⏳ PDF формується…")
+
+    def show_pdf_job(key, file_name, on_done=None):
+        job_id = st.session_state.get(key)
+        if not job_id:
+            return
+        job = render_queue.job(job_id)
+        if job is None:
+            # finished too long ago and dropped from the queue
+            del st.session_state[key]
+        elif job.state == FAILED:
+            st.error(f"Не вдалося сформувати PDF: {job.error()}")
+            del st.session_state[key]
+        elif job.state == DONE:
+            pdf_bytes = job.result()
+            if on_done:
+                on_done(job, pdf_bytes)
+            st.download_button("⬇️ Завантажити PDF",pdf_bytes,file_name=file_name,mime="application/pdf",key=f"{key}_download")
+        else:
+            pdf_job_progress(job_id)
+
+    def save_job_quote(job, pdf_bytes):
+        if st.session_state.get("pdf_job_saved") != job.id:
+            with instrumentation.span("quote.save"):
+                save_quote(job.data, pdf_bytes, job.context)
+            st.session_state["pdf_job_saved"] = job.id
+
+    show_pdf_job("pdf_job", "koshtorys.pdf", save_job_quote)
+
+    variants = st.session_state.setdefault("variants", [])
+
+    # callbacks run before the script, so the expander below already shows the new list
+    def add_variant():
+        name = st.session_state["variant_name"].strip() or f"Варіант {len(variants) + 1}"
+        base, n = name, 2
+        while name in {v.name for v in variants}:
+            name = f"{base} ({n})"
+            n += 1
+        variants.append(Variant(name, st.session_state["ring_w"]["config"], st.session_state["ring_m"]["config"]))
+        st.session_state["variant_name"] = ""
+
+    def remove_variant(i):
+        del variants[i]
+
+    with st.expander(f"⚖️ Порівняння варіантів ({len(variants)})"):
+        st.caption("Налаштуйте обручки вище й додайте пару як варіант; усі варіанти потраплять в один PDF.")
+        v1, v2 = st.columns([3, 1])
+        v1.text_input(
+            "Назва варіанту",
+            placeholder=f"Варіант {len(variants) + 1}",
+            key="variant_name",
+        )
+        v2.markdown("<div style='height:1.75rem'></div>", unsafe_allow_html=True)
+        v2.button("➕ Додати пару", disabled=len(variants) >= MAX_VARIANTS, key="variant_add", on_click=add_variant)
+
+        if variants:
+            # every ring of every variant is priced in one batch against the current catalog
+            with instrumentation.span("variants.price", variants=len(variants)):
+                rows = comparison_rows(variants, catalog)
+            st.dataframe(
+                pd.DataFrame(
+                    [[label, *cells] for _, label, cells in rows],
+                    columns=["", *(v.name for v in variants)],
+                ),
+                width="stretch",
+                hide_index=True,
+            )
+
+            remove = st.columns(len(variants) + 1)
+            for i, variant in enumerate(variants):
+                remove[i].button(f"✕ {variant.name}", key=f"variant_remove_{i}", on_click=remove_variant, args=(i,))
+
+            if remove[-1].button("📄 PDF порівняння", key="variant_pdf"):
+                data = {
+                    "photo1":st.session_state.get("p1"),
+                    "photo2":st.session_state.get("p2"),
+                    "w_size":woman["size"],
+                    "m_size":man["size"],
+                    "w_width":woman["width"],
+                    "m_width":man["width"],
+                    "w_thickness":woman["thickness"],
+                    "m_thickness":man["thickness"],
+                    "variant_names":[v.name for v in variants],
+                    "variant_rows":rows,
+                    "couple_names": st.session_state.get("couple_names","").strip() or None,
+                    "agreement_number": st.session_state.get("agreement_number","").strip() or None,
+                    "text_color": catalog.text_color,
+                    "background_file": catalog.background_file,
+                    "background_path": get_background_path(catalog.background_file),
+                }
+                try:
+                    st.session_state["comparison_job"] = render_queue.submit_comparison(data, context=catalog)
+                except QueueFull as exc:
+                    st.warning(f"Забагато запитів на PDF: {exc}")
+
+        show_pdf_job("comparison_job", "porivnyannia.pdf")
+
+    @st.fragment
+    def price_sheet_section():
+        catalog = get_catalog()
+        s1, s2, s3 = st.columns(3)
+        weight_from = s1.number_input("Вага від, г", min_value=0.1, value=2.0, step=0.5, key="sheet_from")
+        weight_to = s2.number_input("Вага до, г", min_value=0.1, value=10.0, step=0.5, key="sheet_to")
+        weight_step = s3.number_input("Крок, г", min_value=0.05, value=0.5, step=0.05, key="sheet_step")
+        s4, s5 = st.columns(2)
+        profile = s4.selectbox("Профіль", [None, *catalog.profiles], format_func=lambda v: v or "—", key="sheet_profile")
+        coating = s5.selectbox("Покриття", [None, *catalog.coatings], format_func=lambda v: v or "—", key="sheet_coating")
+
+        weights = weight_range(weight_from, weight_to, weight_step)
+        if not len(weights):
+            st.info("Вага «до» має бути не меншою за «від».")
+            return
+        if len(weights) > MAX_SHEET_WEIGHTS:
+            st.warning(f"Забагато рядків ({len(weights)}), максимум {MAX_SHEET_WEIGHTS}: збільште крок.")
+            return
+
+        # every metal x work type x weight in one numpy pass
+        with instrumentation.span("price_sheet.grid", weights=len(weights)):
+            grid = price_grid(catalog, weights, profile=profile, coating=coating)
+        columns = [f"{metal} · {jew}" for metal in grid.metals for jew in grid.jeweler_types]
+        sheet = pd.DataFrame(
+            grid.totals.reshape(len(columns), len(weights)).T.round(),
+            index=pd.Index(grid.weights, name="Вага г"),
+            columns=columns,
+        )
+        st.dataframe(sheet, width="stretch")
+
+        if st.button("📄 PDF прайс-листа", key="sheet_pdf"):
+            data = {
+                "text_color": catalog.text_color,
+                "background_file": catalog.background_file,
+                "background_path": get_background_path(catalog.background_file),
+            }
+            try:
+                st.session_state["sheet_job"] = render_queue.submit_price_sheet(grid, data, context=catalog)
+            except QueueFull as exc:
+                st.warning(f"Забагато запитів на PDF: {exc}")
+            else:
+                # progress and the download button are drawn outside this fragment
+                st.rerun()
+
+    st.divider()
+    with st.expander("📊 Прайс-лист"):
+        price_sheet_section()
+        show_pdf_job("sheet_job", "prais-lyst.pdf")
+
+    @st.fragment
+    def history_section():
+        history_query = st.text_input("Пошук за іменами або номером угоди", key="history_query")
+        with instrumentation.span("history.search"):
+            found = search_quotes(history_query, limit=20)
+        if not found:
+            st.info("Нічого не знайдено.")
+        else:
+            labels = {
+                q["id"]: f'{q["created_at"]} · {q["agreement_number"] or "—"} · '
+                         f'{q["couple_names"] or "—"} · {(q["pair_total"] or 0):.0f} ₴'
+                for q in found
+            }
+            selected_quote = st.selectbox("Кошторис", list(labels), format_func=labels.get, key="history_quote")
+            stored = get_quote(selected_quote)
+            payload = stored["payload"]
+
+            h1, h2 = st.columns(2)
+            with h1:
+                st.markdown("#### Жіноча")
+                st.dataframe(payload.get("w_pricing_rows", []), width="stretch", hide_index=True)
+            with h2:
+                st.markdown("#### Чоловіча")
+                st.dataframe(payload.get("m_pricing_rows", []), width="stretch", hide_index=True)
+            st.markdown(f'### 🧾 Разом: {(payload.get("pair_total") or 0):.2f} ₴')
+
+            if stored["pdf_sha256"]:
+                st.download_button(
+                    "⬇️ Завантажити PDF",
+                    # read from disk only when the button is clicked
+                    lambda: get_quote_pdf(stored["pdf_sha256"]),
+                    file_name=f'koshtorys-{payload.get("agreement_number") or stored["id"]}.pdf',
+                    mime="application/pdf",
+                    key="history_download",
+                )
 
-        with open(out,"rb") as f:
-            st.download_button("⬇️ Завантажити PDF",f,file_name="koshtorys.pdf")
+    # like the admin tab: nothing below, not even the search, runs while it is closed
+    history = st.expander("🗂 Історія кошторисів", key="history", on_change="rerun")
+    if history.open:
+        with history:
+            history_section()
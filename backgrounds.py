@@ -0,0 +1,26 @@
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+ASSETS_DIR = BASE_DIR / "assets"
+BACKGROUNDS_DIR = ASSETS_DIR / "backgrounds"
+ALLOWED_SUFFIXES = {".png", ".jpg", ".jpeg"}
+
+
+def list_background_files():
+    return sorted([f.name for f in BACKGROUNDS_DIR.iterdir() if f.is_file() and f.suffix.lower() in ALLOWED_SUFFIXES])
+
+
+def list_background_paths():
+    return [str(BACKGROUNDS_DIR / name) for name in list_background_files()]
+
+
+def get_background_path(filename):
+    candidate = BACKGROUNDS_DIR / filename
+    if candidate.exists():
+        return str(candidate)
+
+    fallback = BACKGROUNDS_DIR / "full_white.png"
+    if fallback.exists():
+        return str(fallback)
+
+    return str(BASE_DIR / "background.png")
@@ -0,0 +1,203 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import fields
+from pathlib import Path
+
+import instrumentation
+import pdf_engine
+from backgrounds import get_background_path
+from database import get_catalog, init_db, normalize_text_color
+from pricing import RingConfig, price_ring
+from rates import get_rate_provider
+
+
+TEXT_FIELDS = {"metal", "jeweler_type", "stone_type", "stone_size", "profile", "engraving", "coating"}
+INT_FIELDS = {"stone_qty"}
+RING_TEXT_KEYS = ("size", "width", "thickness")
+NUMBER_KEYS = ("w_weight", "m_weight", "w_total", "m_total", "pair_total")
+
+
+def read_records(path):
+    path = Path(path)
+    if path.suffix.lower() == ".csv":
+        with path.open(newline="", encoding="utf-8-sig") as f:
+            return list(csv.DictReader(f))
+
+    records = []
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def ring_config(record, prefix):
+    values = {}
+    for field in fields(RingConfig):
+        value = record.get(f"{prefix}_{field.name}")
+        if value is None or value == "":
+            continue
+        if field.name in TEXT_FIELDS:
+            values[field.name] = str(value)
+        elif field.name in INT_FIELDS:
+            values[field.name] = int(float(value))
+        else:
+            values[field.name] = float(value)
+    return RingConfig(**values)
+
+
+def _photo_path(value, base_dir):
+    if not value:
+        return None
+    path = Path(value)
+    if not path.is_absolute():
+        path = base_dir / path
+    return str(path)
+
+
+def build_payload(record, catalog, base_dir=Path(".")):
+    """Turn one input record into the dict generate_pdf() expects.
+
+    Records that carry ``w_pricing_rows``/``m_pricing_rows`` are rendered as-is.
+    Otherwise both rings are priced from ``w_*``/``m_*`` RingConfig fields against
+    the current catalog, which is what re-quoting after a price update needs.
+    A ``rate_date`` (YYYY-MM-DD) prices the stones at that day's USD rate.
+    """
+    data = dict(record)
+    if record.get("rate_date"):
+        catalog = get_rate_provider().catalog_on(date.fromisoformat(str(record["rate_date"])), catalog)
+
+    if "w_pricing_rows" in data:
+        for prefix in ("w", "m"):
+            rows = data.get(f"{prefix}_pricing_rows") or []
+            data[f"{prefix}_pricing_rows"] = json.loads(rows) if isinstance(rows, str) else rows
+    else:
+        for prefix in ("w", "m"):
+            quote = price_ring(ring_config(record, prefix), catalog)
+            data[f"{prefix}_pricing_rows"] = quote.pricing_rows()
+            data[f"{prefix}_total"] = quote.total
+        data["pair_total"] = data["w_total"] + data["m_total"]
+
+    for key in NUMBER_KEYS:
+        data[key] = float(data.get(key) or 0)
+    for prefix in ("w", "m"):
+        for key in RING_TEXT_KEYS:
+            data[f"{prefix}_{key}"] = str(data.get(f"{prefix}_{key}") or "")
+
+    data["photo1"] = _photo_path(data.get("photo1"), base_dir)
+    data["photo2"] = _photo_path(data.get("photo2"), base_dir)
+    data["couple_names"] = str(data.get("couple_names") or "").strip() or None
+    data["agreement_number"] = str(data.get("agreement_number") or "").strip() or None
+    data["text_color"] = normalize_text_color(data.get("text_color") or catalog.text_color)
+    data["background_file"] = data.get("background_file") or catalog.background_file
+    data["background_path"] = get_background_path(data["background_file"])
+    return data
+
+
+def output_name(index, record):
+    if record.get("output"):
+        return Path(record["output"]).name
+    agreement = re.sub(r"[^\w.-]+", "_", str(record.get("agreement_number") or "")).strip("_")
+    return f"{index:04d}_{agreement}.pdf" if agreement else f"{index:04d}.pdf"
+
+
+def _init_worker(background_paths):
+    pdf_engine.warm_up(background_paths)
+
+
+def _render(index, data, out):
+    started = time.perf_counter()
+    try:
+        pdf_engine.generate_pdf(data, out)
+    except Exception as exc:
+        return index, out, time.perf_counter() - started, f"{type(exc).__name__}: {exc}"
+    return index, out, time.perf_counter() - started, None
+
+
+def run_batch(input_path, out_dir, workers=None):
+    input_path = Path(input_path)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    started = time.perf_counter()
+    init_db()
+    catalog = get_catalog()
+    records = read_records(input_path)
+
+    jobs = []
+    failures = []
+    for index, record in enumerate(records):
+        try:
+            data = build_payload(record, catalog, input_path.parent)
+        except Exception as exc:
+            failures.append({"index": index, "output": None, "error": f"{type(exc).__name__}: {exc}"})
+            continue
+        jobs.append((index, data, str(out_dir / output_name(index, record))))
+
+    timings = []
+    # decode only the backgrounds these jobs use, not every file in the directory
+    background_paths = sorted({data["background_path"] for _, data, _ in jobs})
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(background_paths,),
+    ) as pool:
+        futures = [pool.submit(_render, *job) for job in jobs]
+        for future in as_completed(futures):
+            index, out, elapsed, error = future.result()
+            timings.append(elapsed)
+            if error:
+                failures.append({"index": index, "output": out, "error": error})
+
+    timings.sort()
+    failures.sort(key=lambda f: f["index"])
+    return {
+        "records": len(records),
+        "rendered": len(jobs) - sum(1 for f in failures if f["output"]),
+        "failed": len(failures),
+        "workers": workers or os.cpu_count(),
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "render_seconds": {
+            "total": round(sum(timings), 3),
+            "p50": round(instrumentation.percentile(timings, 50), 3),
+            "p95": round(instrumentation.percentile(timings, 95), 3),
+            "max": round(timings[-1], 3) if timings else 0.0,
+        },
+        "failures": failures,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render many quote PDFs in parallel.")
+    parser.add_argument("input", help="JSONL or CSV file, one quote per record")
+    parser.add_argument("-o", "--out-dir", default="batch_pdfs", help="directory for the generated PDFs")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--summary", help="also write the summary as JSON to this path")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.input, args.out_dir, args.workers)
+
+    print(
+        f"{summary['rendered']}/{summary['records']} PDFs in {summary['wall_seconds']}s "
+        f"({summary['workers']} workers; p50 {summary['render_seconds']['p50']}s, "
+        f"p95 {summary['render_seconds']['p95']}s, max {summary['render_seconds']['max']}s)"
+    )
+    for failure in summary["failures"]:
+        print(f"  #{failure['index']}: {failure['error']}", file=sys.stderr)
+
+    if args.summary:
+        Path(args.summary).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
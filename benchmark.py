@@ -0,0 +1,357 @@
+"""Benchmark pricing, catalog reads and PDF rendering; compare two runs for regressions.
+
+    python benchmark.py run -o bench.json              # all cases
+    python benchmark.py run -o bench.json -k pdf/ -n 30
+    python benchmark.py compare base.json bench.json   # exit 1 on regressions
+    python benchmark.py size                           # standard vs compact (PDF_COMPACT=1) size
+
+Runs against a scratch copy of data.db. Latencies are measured after one
+warm-up call and with the PDF result cache off; peak memory is the Python
+heap (tracemalloc) during one extra call, so buffers allocated inside
+Pillow are not included.
+"""
+import argparse
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import replace
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+
+import database
+import instrumentation
+import pdf_engine
+from backgrounds import list_background_paths
+from batch_pdf import build_payload, ring_config
+from pricing import Variant, comparison_rows, price_grid, price_ring, price_totals, weight_range
+
+BASE_DIR = Path(__file__).resolve().parent
+DEFAULT_ITERATIONS = 10
+COLD_ITERATIONS = 3
+DEFAULT_THRESHOLD_PCT = 15.0
+# differences below this are timer noise, whatever the percentage
+NOISE_FLOOR_MS = 0.05
+
+QUOTE_SIZES = ("minimal", "typical", "compact")
+PHOTO_COUNTS = (0, 1, 2)
+
+
+# ================= FIXTURES =================
+
+def quote_record(size, catalog):
+    """A two-ring record: minimal = metal and work only, compact = every option (>= 12 rows)."""
+    def first(prices):
+        return next(iter(prices))
+
+    record = {
+        "couple_names": "Іван та Марія",
+        "agreement_number": "WG-2026-001",
+        "w_size": "16", "m_size": "19.5",
+        "w_width": "3", "m_width": "4",
+        "w_thickness": "1.5", "m_thickness": "2",
+    }
+    for prefix, weight in (("w", 3.2), ("m", 5.1)):
+        record.update({
+            f"{prefix}_metal": "Золото 585",
+            f"{prefix}_jeweler_type": first(catalog.jeweler),
+            f"{prefix}_weight": weight,
+            f"{prefix}_metal_discount": 10,
+        })
+        if size in ("typical", "compact"):
+            record.update({
+                f"{prefix}_stone_type": database.STONE_TYPES[0],
+                f"{prefix}_stone_size": "2.00",
+                f"{prefix}_stone_qty": 5,
+                f"{prefix}_engraving": first(catalog.engravings),
+            })
+        if size == "compact":
+            record.update({
+                f"{prefix}_jeweler_discount": 5,
+                f"{prefix}_profile": first(catalog.profiles),
+                f"{prefix}_profile_discount": 10,
+                f"{prefix}_engraving_discount": 10,
+                f"{prefix}_coating": first(catalog.coatings),
+                f"{prefix}_combo": 500,
+            })
+    return record
+
+
+def photo_bytes(seed, size=(2400, 3200)):
+    from PIL import Image
+
+    # noise keeps the JPEG from compressing to nothing, like a real photo
+    pixels = np.random.default_rng(seed).integers(0, 256, (size[1] // 8, size[0] // 8, 3), dtype=np.uint8)
+    image = Image.fromarray(pixels).resize(size)
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def payload(size, photos, catalog, background_path=None, photo_data=()):
+    data = build_payload(quote_record(size, catalog), catalog, BASE_DIR)
+    for i in range(photos):
+        data[f"photo{i + 1}"] = BytesIO(photo_data[i])
+    if background_path:
+        data["background_path"] = str(background_path)
+    return data
+
+
+# ================= CASES =================
+
+def build_cases(iterations):
+    """name -> (callable, iterations, setup run before every timed call or None)."""
+    catalog = database.get_catalog()
+    photo_data = (photo_bytes(1), photo_bytes(2))
+    render = lambda data: (lambda: pdf_engine.generate_pdf(data, use_cache=False))
+    cases = {}
+
+    def load_catalog():
+        with database.read_conn() as conn:
+            return database.load_catalog(conn)
+
+    cases["catalog/load"] = (load_catalog, iterations, None)
+    cases["catalog/get-warm"] = (database.get_catalog, iterations, None)
+    cases["catalog/get-invalidated"] = (database.get_catalog, iterations, database.invalidate_catalog)
+
+    configs = {
+        size: [
+            ring_config(quote_record(size, catalog), prefix)
+            for prefix in ("w", "m")
+        ]
+        for size in QUOTE_SIZES
+    }
+    for size in QUOTE_SIZES:
+        pair = configs[size]
+        cases[f"pricing/rerun-{size}"] = (
+            lambda pair=pair: [price_ring(c, catalog).pricing_rows() for c in pair],
+            iterations,
+            None,
+        )
+    grid = [replace(configs["compact"][0], weight=w / 10) for w in range(1, 10001)]
+    cases["pricing/vector-10k"] = (lambda: price_totals(grid, catalog), iterations, None)
+    sheet_weights = weight_range(0.1, 100, 0.1)
+    cases["pricing/grid-15k"] = (lambda: price_grid(catalog, sheet_weights), iterations, None)
+
+    for size in QUOTE_SIZES:
+        for photos in PHOTO_COUNTS:
+            data = payload(size, photos, catalog, photo_data=photo_data)
+            cases[f"pdf/{size}-photos{photos}"] = (render(data), iterations, None)
+
+    for path in list_background_paths():
+        data = payload("typical", 0, catalog, path)
+        cases[f"pdf/background-{Path(path).stem}"] = (render(data), iterations, None)
+
+    sheet = price_grid(catalog, weight_range(2, 10, 0.5))
+    data = payload("typical", 0, catalog)
+    cases["pdf/price-sheet"] = (lambda: pdf_engine.generate_price_sheet(sheet, data), iterations, None)
+
+    variants = [Variant(size, *configs[size]) for size in QUOTE_SIZES]
+    comparison = payload("typical", 2, catalog, photo_data=photo_data)
+    comparison["variant_names"] = [v.name for v in variants]
+    comparison["variant_rows"] = comparison_rows(variants, catalog)
+    cases["pricing/variants"] = (lambda: comparison_rows(variants, catalog), iterations, None)
+    cases["pdf/comparison"] = (lambda: pdf_engine.generate_comparison_pdf(comparison), iterations, None)
+
+    cases["pdf/cold-background"] = (render(data), COLD_ITERATIONS, pdf_engine.forget_background)
+    data = payload("typical", 2, catalog, photo_data=photo_data)
+    cases["pdf/cold-photos2"] = (render(data), COLD_ITERATIONS, pdf_engine.forget_photos)
+    return cases
+
+
+def measure(fn, iterations, setup=None):
+    if setup:
+        setup()
+    result = fn()  # warm-up, not timed
+
+    timings = []
+    for _ in range(iterations):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    stats = {
+        "iterations": iterations,
+        "min_ms": round(timings[0] * 1000, 4),
+        "p50_ms": round(instrumentation.percentile(timings, 50) * 1000, 4),
+        "p95_ms": round(instrumentation.percentile(timings, 95) * 1000, 4),
+        "p99_ms": round(instrumentation.percentile(timings, 99) * 1000, 4),
+        "mean_ms": round(statistics.fmean(timings) * 1000, 4),
+        "peak_kib": round(peak / 1024, 1),
+    }
+    if isinstance(result, bytes):
+        stats["pdf_bytes"] = len(result)
+    return stats
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextmanager
+def scratch_db(source):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "bench.db")
+        shutil.copyfile(source, db_path)
+        database.DB = db_path
+        database.init_db()
+        try:
+            yield
+        finally:
+            database.get_manager().close()
+
+
+def run(iterations, pattern, source):
+    with scratch_db(source):
+        cases = build_cases(iterations)
+        results = {}
+        for name, (fn, count, setup) in cases.items():
+            if pattern and pattern not in name:
+                continue
+            results[name] = measure(fn, count, setup)
+            stats = results[name]
+            size = f"  {stats['pdf_bytes'] / 1024:8.1f} KiB pdf" if "pdf_bytes" in stats else ""
+            print(
+                f"{name:<28} p50 {stats['p50_ms']:9.3f} ms  p95 {stats['p95_ms']:9.3f} ms  "
+                f"peak {stats['peak_kib']:9.1f} KiB{size}"
+            )
+
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "background_dpi": pdf_engine.BACKGROUND_DPI,
+            "templates": pdf_engine.PDF_TEMPLATES,
+            "compact": pdf_engine.PDF_COMPACT,
+        },
+        "cases": results,
+    }
+
+
+# ================= SIZE =================
+
+def size_report(source):
+    """Standard vs compact PDF size per fixture; False when a font is embedded whole."""
+    ok = True
+    with scratch_db(source):
+        catalog = database.get_catalog()
+        photo_data = (photo_bytes(1), photo_bytes(2))
+        for size in QUOTE_SIZES:
+            for photos in PHOTO_COUNTS:
+                report = pdf_engine.pdf_size_report(payload(size, photos, catalog, photo_data=photo_data))
+                fonts = f"  full fonts: {', '.join(report['full_fonts'])}" if report["full_fonts"] else ""
+                lossy = (
+                    f"  {report['lossy_images']} image(s) as JPEG q{report['jpeg_quality']}"
+                    if report["lossy_images"] else "  lossless"
+                )
+                ok = ok and not report["full_fonts"]
+                print(
+                    f"{size}-photos{photos:<14} {report['standard_bytes'] / 1024:9.1f} KiB -> "
+                    f"{report['compact_bytes'] / 1024:7.1f} KiB  x{report['ratio']}{lossy}{fonts}"
+                )
+    return ok
+
+
+# ================= COMPARE =================
+
+COMPARED = (
+    ("p50_ms", "latency p50"),
+    ("p95_ms", "latency p95"),
+    ("peak_kib", "peak memory"),
+    ("pdf_bytes", "pdf size"),
+)
+
+
+def compare(base, new, threshold_pct=DEFAULT_THRESHOLD_PCT):
+    """Return (lines, regressions) for the cases present in both runs."""
+    lines = []
+    regressions = []
+    for name in sorted(set(base["cases"]) & set(new["cases"])):
+        before, after = base["cases"][name], new["cases"][name]
+        for key, label in COMPARED:
+            if key not in before or key not in after:
+                continue
+            old, cur = before[key], after[key]
+            change = (cur - old) / old * 100 if old else 0.0
+            noise = key.endswith("_ms") and abs(cur - old) < NOISE_FLOOR_MS
+            flag = change > threshold_pct and not noise
+            if flag:
+                regressions.append((name, label, old, cur, change))
+            if flag or key == "p50_ms":
+                lines.append(f"{'!' if flag else ' '} {name:<28} {label:<12} {old:12.3f} -> {cur:12.3f}  {change:+7.1f}%")
+
+    for name in sorted(set(base["cases"]) - set(new["cases"])):
+        lines.append(f"  {name:<28} missing from the new run")
+    return lines, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks and save the results as JSON")
+    run_parser.add_argument("-o", "--output", help="JSON file for the results")
+    run_parser.add_argument("-n", "--iterations", type=int, default=DEFAULT_ITERATIONS)
+    run_parser.add_argument("-k", "--filter", default="", help="only run cases whose name contains this")
+    run_parser.add_argument("--db", default=str(BASE_DIR / "data.db"), help="database to copy (default: data.db)")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two result files")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_PCT, help="allowed growth in percent")
+
+    size_parser = commands.add_parser("size", help="report the PDF size in the standard and the compact mode")
+    size_parser.add_argument("--db", default=str(BASE_DIR / "data.db"), help="database to copy (default: data.db)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = run(args.iterations, args.filter, args.db)
+        if args.output:
+            Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        return 0
+
+    if args.command == "size":
+        return 0 if size_report(args.db) else 1
+
+    base = json.loads(Path(args.base).read_text(encoding="utf-8"))
+    new = json.loads(Path(args.new).read_text(encoding="utf-8"))
+    lines, regressions = compare(base, new, args.threshold)
+    print(f"{base['meta'].get('commit')} -> {new['meta'].get('commit')} (threshold {args.threshold:.0f}%)")
+    for line in lines:
+        print(line)
+    print(f"regressions {len(regressions)}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
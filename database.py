@@ -1,5 +1,20 @@
 import sqlite3
 import re
+import hashlib
+import json
+import os
+import uuid
+from datetime import datetime
+from pathlib import Path
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from types import MappingProxyType
+
+import instrumentation
 
 DB = "data.db"
 
@@ -35,21 +50,348 @@ def normalize_background_file(value):
         return value.strip()
     return DEFAULT_BACKGROUND_FILE
 
+BUSY_TIMEOUT_MS = 5000
+READ_POOL_SIZE = 8
+WRITE_RETRIES = 5
+PRAGMAS = (
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-8000",
+)
+
+
+class TracedCursor(sqlite3.Cursor):
+    """Reports statement times to the slow-query log while instrumentation is on."""
+
+    def execute(self, sql, parameters=()):
+        if not instrumentation.is_enabled():
+            return super().execute(sql, parameters)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            instrumentation.record_query(sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        if not instrumentation.is_enabled():
+            return super().executemany(sql, seq_of_parameters)
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            instrumentation.record_query(sql, time.perf_counter() - started, len(seq_of_parameters))
+
+
+class TracedConnection(sqlite3.Connection):
+    def cursor(self, factory=TracedCursor):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute() does not go through cursor(), so route it explicitly
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
 def get_conn():
-    return sqlite3.connect(DB, check_same_thread=False)
+    return sqlite3.connect(DB, check_same_thread=False, factory=TracedConnection)
 
-def init_db():
-    conn = get_conn()
-    cur = conn.cursor()
 
+def _open(path, readonly):
+    conn = sqlite3.connect(
+        path,
+        timeout=BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        isolation_level=None,
+        factory=TracedConnection,
+    )
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    if readonly:
+        conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+class ConnectionManager:
+    """WAL-mode access to one database file.
+
+    Reads borrow a query-only connection from a small pool (Streamlit runs every
+    rerun on a fresh thread, so thread-locals would leak one per rerun). All
+    writes go through a single writer thread, one transaction per job, retried
+    with backoff while the file is busy.
+    """
+
+    def __init__(self, path, pool_size=READ_POOL_SIZE):
+        self.path = path
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self._jobs = queue.Queue()
+        self._closed = False
+
+        conn = _open(path, readonly=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        self._writer_conn = conn
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+
+    @contextmanager
+    def read(self):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            instrumentation.count("db.read_pool_misses")
+            conn = _open(self.path, readonly=True)
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            try:
+                self._pool.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def submit(self, fn, *args):
+        if self._closed:
+            raise RuntimeError("ConnectionManager is closed")
+        future = Future()
+        self._jobs.put((fn, args, future))
+        return future
+
+    def write(self, fn, *args):
+        """Run fn(conn, *args) in one write transaction and return its result."""
+        return self.submit(fn, *args).result()
+
+    def execute(self, sql, params=()):
+        return self.write(lambda conn: conn.execute(sql, params).rowcount)
+
+    def executemany(self, sql, seq_of_params):
+        return self.write(lambda conn: conn.executemany(sql, seq_of_params).rowcount)
+
+    def _write_loop(self):
+        conn = self._writer_conn
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            fn, args, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            instrumentation.count("db.writes")
+            started = time.perf_counter()
+            for attempt in range(WRITE_RETRIES):
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        result = fn(conn, *args)
+                        conn.execute("COMMIT")
+                    except BaseException:
+                        if conn.in_transaction:
+                            conn.execute("ROLLBACK")
+                        raise
+                except sqlite3.OperationalError as exc:
+                    busy = "locked" in str(exc) or "busy" in str(exc)
+                    if busy and attempt < WRITE_RETRIES - 1:
+                        instrumentation.count("db.write_retries")
+                        time.sleep(0.05 * 2 ** attempt)
+                        continue
+                    future.set_exception(exc)
+                except Exception as exc:
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+                break
+            if instrumentation.is_enabled():
+                instrumentation.record_duration("db.write", time.perf_counter() - started)
+        conn.close()
+
+    def close(self):
+        self._closed = True
+        self._jobs.put(None)
+        self._writer.join()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_manager_lock = threading.Lock()
+_manager = None
+
+
+def get_manager():
+    """Process-wide ConnectionManager for the current DB path."""
+    global _manager
+    manager = _manager
+    if manager is not None and manager.path == DB:
+        return manager
+    with _manager_lock:
+        if _manager is None or _manager.path != DB:
+            if _manager is not None:
+                _manager.close()
+            _manager = ConnectionManager(DB)
+        return _manager
+
+
+@contextmanager
+def read_conn():
+    with get_manager().read() as conn:
+        yield conn
+
+
+def write(fn, *args):
+    return get_manager().write(fn, *args)
+
+
+def execute_write(sql, params=()):
+    return get_manager().execute(sql, params)
+
+
+CATALOG_TABLES = ("metals", "jeweler", "profiles", "engravings", "coatings")
+EDITABLE_TABLES = CATALOG_TABLES + ("stones",)
+
+
+def _same_value(a, b):
+    # NaN (an emptied cell in the editor) never equals itself
+    if a != a and b != b:
+        return True
+    return a == b
+
+
+def diff_rows(original, edited):
+    """Compare rows keyed by their first column.
+
+    Returns the number of changed cells and UPDATE parameters (non-key values
+    followed by the key) for the rows that have at least one change.
+    """
+    before = {row[0]: row for row in original}
+    changed_cells = 0
+    params = []
+    for row in edited:
+        old = before.get(row[0])
+        if old is None:
+            continue
+        changes = sum(1 for a, b in zip(old[1:], row[1:]) if not _same_value(a, b))
+        if changes:
+            changed_cells += changes
+            params.append(tuple(row[1:]) + (row[0],))
+    return changed_cells, params
+
+
+def save_table_edits(table, columns, original, edited):
+    """Write only the changed rows of an admin table in one transaction."""
+    if table not in EDITABLE_TABLES:
+        raise ValueError(f"Unknown table: {table}")
+    changed_cells, params = diff_rows(original, edited)
+    if params:
+        assignments = ",".join(f"{c}=?" for c in columns[1:])
+        sql = f"UPDATE {table} SET {assignments} WHERE {columns[0]}=?"
+        get_manager().executemany(sql, params)
+    return changed_cells
+
+
+@dataclass(frozen=True)
+class Catalog:
+    version: int
+    metals: MappingProxyType
+    jeweler: MappingProxyType
+    stones: MappingProxyType
+    profiles: MappingProxyType
+    engravings: MappingProxyType
+    coatings: MappingProxyType
+    usd: float
+    background_file: str
+    text_color: str
+
+
+_catalog_lock = threading.Lock()
+_catalog = None
+
+
+def _read_prices(cur, table):
+    # first column is the key (name/type), second one is the price
+    return MappingProxyType({
+        key: float(price or 0)
+        for key, price in cur.execute(f"SELECT * FROM {table}")
+    })
+
+
+def catalog_version(conn):
+    return conn.execute("SELECT version FROM catalog_version WHERE id=1").fetchone()[0]
+
+
+def load_catalog(conn):
+    # one read transaction, so the stamp always belongs to the prices read with it
+    conn.execute("BEGIN")
+    try:
+        return _load_catalog(conn.cursor())
+    finally:
+        conn.execute("COMMIT")
+
+
+def _load_catalog(cur):
+    version = catalog_version(cur)
+    prices = {table: _read_prices(cur, table) for table in CATALOG_TABLES}
+
+    stones = {}
+    cur.execute(f"SELECT size, {', '.join(STONE_TYPES)} FROM stones")
+    for size, *values in cur.fetchall():
+        stones[size] = MappingProxyType({
+            stone_type: float(value or 0)
+            for stone_type, value in zip(STONE_TYPES, values)
+        })
+
+    usd, background_file, text_color = cur.execute(
+        "SELECT usd, background_file, text_color FROM settings WHERE id=1"
+    ).fetchone()
+
+    return Catalog(
+        version=version,
+        stones=MappingProxyType(stones),
+        usd=float(usd),
+        background_file=normalize_background_file(background_file),
+        text_color=normalize_text_color(text_color),
+        **prices,
+    )
+
+
+def get_catalog():
+    """Process-wide catalog snapshot, rebuilt when the catalog_version stamp moves.
+
+    Every write to a catalog table bumps the stamp by trigger in the same
+    transaction, so an admin save in one process (Streamlit) is picked up by
+    all the others (api.py, batch workers) on their next call.
+    """
+    global _catalog
+    with read_conn() as conn:
+        version = catalog_version(conn)
+        catalog = _catalog
+        if catalog is not None and catalog.version == version:
+            return catalog
+
+        with _catalog_lock:
+            if _catalog is None or _catalog.version != version:
+                _catalog = load_catalog(conn)
+            return _catalog
+
+
+def invalidate_catalog():
+    """Drop this process's snapshot; the next get_catalog() reloads it."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
+
+def _migration_1_catalog(cur):
     cur.execute("""
     CREATE TABLE IF NOT EXISTS metals(
         name TEXT PRIMARY KEY,
         price REAL DEFAULT 0
     )
     """)
-    for m in FIXED_METALS:
-        cur.execute("INSERT OR IGNORE INTO metals VALUES(?,0)", (m,))
+    cur.executemany("INSERT OR IGNORE INTO metals VALUES(?,0)", [(m,) for m in FIXED_METALS])
 
     cur.execute("""
     CREATE TABLE IF NOT EXISTS jeweler(
@@ -57,36 +399,16 @@ def init_db():
         price REAL DEFAULT 0
     )
     """)
-    for t in JEWELER_TYPES:
-        cur.execute("INSERT OR IGNORE INTO jeweler VALUES(?,0)", (t,))
+    cur.executemany("INSERT OR IGNORE INTO jeweler VALUES(?,0)", [(t,) for t in JEWELER_TYPES])
 
     # USD rate
     cur.execute("""
     CREATE TABLE IF NOT EXISTS settings(
         id INTEGER PRIMARY KEY,
-        usd REAL DEFAULT 40,
-        background_file TEXT DEFAULT 'full_white.png'
+        usd REAL DEFAULT 40
     )
     """)
-
-    settings_cols = [row[1] for row in cur.execute("PRAGMA table_info(settings)")]
-    if "background_file" not in settings_cols:
-        cur.execute("ALTER TABLE settings ADD COLUMN background_file TEXT DEFAULT 'full_white.png'")
-    if "text_color" not in settings_cols:
-        cur.execute("ALTER TABLE settings ADD COLUMN text_color TEXT DEFAULT '#000000'")
-
-    cur.execute(
-        "INSERT OR IGNORE INTO settings(id, usd, background_file, text_color) VALUES(1,40,?,?)",
-        (DEFAULT_BACKGROUND_FILE, DEFAULT_TEXT_COLOR),
-    )
-    current_background = cur.execute("SELECT background_file FROM settings WHERE id=1").fetchone()[0]
-    normalized_background = normalize_background_file(current_background)
-    if current_background != normalized_background:
-        cur.execute("UPDATE settings SET background_file=? WHERE id=1", (normalized_background,))
-    current_color = cur.execute("SELECT text_color FROM settings WHERE id=1").fetchone()[0]
-    normalized_color = normalize_text_color(current_color)
-    if current_color != normalized_color:
-        cur.execute("UPDATE settings SET text_color=? WHERE id=1", (normalized_color,))
+    cur.execute("INSERT OR IGNORE INTO settings(id, usd) VALUES(1,40)")
 
     # stones in USD
     cur.execute("""
@@ -98,8 +420,7 @@ def init_db():
         zircon REAL DEFAULT 0
     )
     """)
-    for s in STONE_SIZES:
-        cur.execute("INSERT OR IGNORE INTO stones(size) VALUES(?)",(s,))
+    cur.executemany("INSERT OR IGNORE INTO stones(size) VALUES(?)", [(s,) for s in STONE_SIZES])
 
     cur.execute("""
     CREATE TABLE IF NOT EXISTS profiles(name TEXT PRIMARY KEY, price REAL DEFAULT 0)
@@ -119,5 +440,353 @@ def init_db():
     cur.execute("INSERT OR IGNORE INTO coatings VALUES('Родій',0)")
     cur.execute("INSERT OR IGNORE INTO coatings VALUES('Рутеній',0)")
 
-    conn.commit()
-    conn.close()
+
+def _migration_2_pdf_settings(cur):
+    settings_cols = [row[1] for row in cur.execute("PRAGMA table_info(settings)")]
+    if "background_file" not in settings_cols:
+        cur.execute("ALTER TABLE settings ADD COLUMN background_file TEXT DEFAULT 'full_white.png'")
+    if "text_color" not in settings_cols:
+        cur.execute("ALTER TABLE settings ADD COLUMN text_color TEXT DEFAULT '#000000'")
+
+    current_background, current_color = cur.execute(
+        "SELECT background_file, text_color FROM settings WHERE id=1"
+    ).fetchone()
+    cur.execute(
+        "UPDATE settings SET background_file=?, text_color=? WHERE id=1",
+        (normalize_background_file(current_background), normalize_text_color(current_color)),
+    )
+
+
+def _migration_3_quotes(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS quote_pdfs(
+        sha256 TEXT PRIMARY KEY,
+        pdf BLOB NOT NULL
+    )
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS quotes(
+        id INTEGER PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        agreement_number TEXT,
+        couple_names TEXT,
+        w_total REAL,
+        m_total REAL,
+        pair_total REAL,
+        payload TEXT NOT NULL,
+        catalog TEXT NOT NULL,
+        pdf_sha256 TEXT REFERENCES quote_pdfs(sha256)
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS quotes_created_at ON quotes(created_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS quotes_agreement_number ON quotes(agreement_number)")
+
+    cur.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS quotes_fts USING fts5(
+        couple_names,
+        agreement_number,
+        content='quotes',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS quotes_ai AFTER INSERT ON quotes BEGIN
+        INSERT INTO quotes_fts(rowid, couple_names, agreement_number)
+        VALUES (new.id, new.couple_names, new.agreement_number);
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS quotes_ad AFTER DELETE ON quotes BEGIN
+        INSERT INTO quotes_fts(quotes_fts, rowid, couple_names, agreement_number)
+        VALUES ('delete', old.id, old.couple_names, old.agreement_number);
+    END
+    """)
+
+
+def _migration_4_usd_rates(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS usd_rates(
+        date TEXT PRIMARY KEY,
+        rate REAL NOT NULL,
+        source TEXT NOT NULL,
+        fetched_at TEXT NOT NULL
+    )
+    """)
+
+
+def _migration_5_catalog_version(cur):
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS catalog_version(
+        id INTEGER PRIMARY KEY CHECK (id=1),
+        version INTEGER NOT NULL
+    )
+    """)
+    cur.execute("INSERT OR IGNORE INTO catalog_version VALUES(1,0)")
+    for table in EDITABLE_TABLES + ("settings",):
+        for event in ("INSERT", "UPDATE", "DELETE"):
+            cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {table}_catalog_{event.lower()} AFTER {event} ON {table} BEGIN
+                UPDATE catalog_version SET version=version+1 WHERE id=1;
+            END
+            """)
+
+
+def _migration_6_quote_pdf_files(cur):
+    # PDFs move out of the database (data.db is tracked in git) into files
+    db_file = next(row[2] for row in cur.execute("PRAGMA database_list") if row[1] == "main")
+    for sha256, pdf in cur.execute("SELECT sha256, pdf FROM quote_pdfs").fetchall():
+        _write_quote_pdf(quote_pdf_dir(db_file), sha256, pdf)
+
+    # rebuilt without the REFERENCES quote_pdfs clause; ids (the FTS rowids) are kept
+    cur.execute("""
+    CREATE TABLE quotes_new(
+        id INTEGER PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        agreement_number TEXT,
+        couple_names TEXT,
+        w_total REAL,
+        m_total REAL,
+        pair_total REAL,
+        payload TEXT NOT NULL,
+        catalog TEXT NOT NULL,
+        pdf_sha256 TEXT
+    )
+    """)
+    cur.execute("INSERT INTO quotes_new SELECT * FROM quotes")
+    cur.execute("DROP TABLE quotes")
+    cur.execute("ALTER TABLE quotes_new RENAME TO quotes")
+    cur.execute("DROP TABLE quote_pdfs")
+    cur.execute("CREATE INDEX quotes_created_at ON quotes(created_at)")
+    cur.execute("CREATE INDEX quotes_agreement_number ON quotes(agreement_number)")
+    cur.execute("""
+    CREATE TRIGGER quotes_ai AFTER INSERT ON quotes BEGIN
+        INSERT INTO quotes_fts(rowid, couple_names, agreement_number)
+        VALUES (new.id, new.couple_names, new.agreement_number);
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER quotes_ad AFTER DELETE ON quotes BEGIN
+        INSERT INTO quotes_fts(quotes_fts, rowid, couple_names, agreement_number)
+        VALUES ('delete', old.id, old.couple_names, old.agreement_number);
+    END
+    """)
+
+
+def _migration_7_drop_manual_usd_rates(cur):
+    # the admin panel used to file its manual rate as that day's rate; dated quotes
+    # must see the rate from the source instead, so those rows are fetched again
+    cur.execute("DELETE FROM usd_rates WHERE source='manual'")
+
+
+# Applied in order, each exactly once per database; the number of applied
+# migrations is stored in PRAGMA user_version. Only ever append to this list.
+MIGRATIONS = [
+    _migration_1_catalog,
+    _migration_2_pdf_settings,
+    _migration_3_quotes,
+    _migration_4_usd_rates,
+    _migration_5_catalog_version,
+    _migration_6_quote_pdf_files,
+    _migration_7_drop_manual_usd_rates,
+]
+
+_schema_lock = threading.Lock()
+_schema_ready_for = None
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(path):
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, isolation_level=None)
+    try:
+        for number, migration in enumerate(MIGRATIONS, start=1):
+            if schema_version(conn) >= number:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # another process may have migrated while we waited for the lock
+                if schema_version(conn) < number:
+                    migration(conn.cursor())
+                    conn.execute(f"PRAGMA user_version={number}")
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+        return schema_version(conn)
+    finally:
+        conn.close()
+
+
+def init_db():
+    """Bring the schema up to date; after the first call in a process this is a no-op."""
+    global _schema_ready_for
+    if _schema_ready_for == DB:
+        return
+
+    with _schema_lock:
+        if _schema_ready_for != DB:
+            migrate(DB)
+            _schema_ready_for = DB
+
+
+# ================= QUOTE HISTORY =================
+
+# inputs that cannot (uploaded files) or should not (machine paths) be stored
+QUOTE_SKIPPED_KEYS = ("photo1", "photo2", "background_path")
+
+
+def quote_pdf_dir(db_path=None):
+    # next to the database, so a scratch copy of data.db keeps its PDFs apart
+    return Path(db_path or DB).resolve().parent / "quote_pdfs"
+
+
+def _write_quote_pdf(directory, sha256, pdf_bytes):
+    path = directory / f"{sha256}.pdf"
+    if path.exists():
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+    tmp.write_bytes(pdf_bytes)
+    os.replace(tmp, path)
+
+
+def catalog_snapshot(catalog):
+    return {
+        "version": catalog.version,
+        "metals": dict(catalog.metals),
+        "jeweler": dict(catalog.jeweler),
+        "stones": {size: dict(prices) for size, prices in catalog.stones.items()},
+        "profiles": dict(catalog.profiles),
+        "engravings": dict(catalog.engravings),
+        "coatings": dict(catalog.coatings),
+        "usd": catalog.usd,
+        "background_file": catalog.background_file,
+        "text_color": catalog.text_color,
+    }
+
+
+def save_quote(data, pdf_bytes, catalog=None):
+    """Store a generated quote with its priced rows and catalog snapshot; the PDF goes to quote_pdf_dir()."""
+    catalog = catalog or get_catalog()
+    payload = {k: v for k, v in data.items() if k not in QUOTE_SKIPPED_KEYS}
+    pdf_sha256 = hashlib.sha256(pdf_bytes).hexdigest()
+    # the file first, so no row ever points at a missing PDF
+    _write_quote_pdf(quote_pdf_dir(), pdf_sha256, pdf_bytes)
+
+    def insert(conn):
+        cur = conn.execute(
+            """
+            INSERT INTO quotes(created_at, agreement_number, couple_names, w_total, m_total,
+                               pair_total, payload, catalog, pdf_sha256)
+            VALUES(?,?,?,?,?,?,?,?,?)
+            """,
+            (
+                datetime.now().isoformat(timespec="seconds"),
+                data.get("agreement_number"),
+                data.get("couple_names"),
+                data.get("w_total"),
+                data.get("m_total"),
+                data.get("pair_total"),
+                json.dumps(payload, ensure_ascii=False, default=str),
+                json.dumps(catalog_snapshot(catalog), ensure_ascii=False),
+                pdf_sha256,
+            ),
+        )
+        return cur.lastrowid
+
+    return write(insert)
+
+
+def _fts_query(text):
+    # every word must match as a prefix: "іва wg-20" -> "іва"* AND "wg"* AND "20"*
+    return " AND ".join(f'"{word}"*' for word in re.findall(r"\w+", text))
+
+
+def search_quotes(text="", limit=50):
+    columns = "q.id, q.created_at, q.agreement_number, q.couple_names, q.pair_total"
+    match = _fts_query(text or "")
+    with read_conn() as conn:
+        if match:
+            rows = conn.execute(
+                f"""
+                SELECT {columns} FROM quotes_fts
+                JOIN quotes q ON q.id = quotes_fts.rowid
+                WHERE quotes_fts MATCH ?
+                ORDER BY q.created_at DESC, q.id DESC LIMIT ?
+                """,
+                (match, limit),
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                f"SELECT {columns} FROM quotes q ORDER BY q.created_at DESC, q.id DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+    keys = ("id", "created_at", "agreement_number", "couple_names", "pair_total")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def get_quote(quote_id):
+    """Stored inputs, rows and catalog of a quote; the PDF itself is read by get_quote_pdf()."""
+    with read_conn() as conn:
+        row = conn.execute(
+            "SELECT id, created_at, payload, catalog, pdf_sha256 FROM quotes WHERE id=?",
+            (quote_id,),
+        ).fetchone()
+    if row is None:
+        return None
+    return {
+        "id": row[0],
+        "created_at": row[1],
+        "payload": json.loads(row[2]),
+        "catalog": json.loads(row[3]),
+        "pdf_sha256": row[4],
+    }
+
+
+def get_quote_pdf(pdf_sha256):
+    try:
+        return (quote_pdf_dir() / f"{pdf_sha256}.pdf").read_bytes()
+    except OSError:
+        return None
+
+
+# ================= USD RATES =================
+
+def record_usd_rate(date, rate, source, apply=True):
+    """Store the rate for ``date`` (ISO string); with ``apply`` also make it the catalog rate."""
+    def upsert(conn):
+        conn.execute(
+            """
+            INSERT INTO usd_rates(date, rate, source, fetched_at) VALUES(?,?,?,?)
+            ON CONFLICT(date) DO UPDATE SET
+                rate=excluded.rate, source=excluded.source, fetched_at=excluded.fetched_at
+            """,
+            (date, float(rate), source, datetime.now().isoformat(timespec="seconds")),
+        )
+        if apply:
+            conn.execute("UPDATE settings SET usd=? WHERE id=1", (float(rate),))
+
+    write(upsert)
+
+
+def usd_rate_on(date):
+    """Latest stored (date, rate) on or before ``date``, or None."""
+    with read_conn() as conn:
+        return conn.execute(
+            "SELECT date, rate FROM usd_rates WHERE date<=? ORDER BY date DESC LIMIT 1",
+            (date,),
+        ).fetchone()
+
+
+def usd_rate_history(limit=30):
+    with read_conn() as conn:
+        rows = conn.execute(
+            "SELECT date, rate, source, fetched_at FROM usd_rates ORDER BY date DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    keys = ("date", "rate", "source", "fetched_at")
+    return [dict(zip(keys, row)) for row in rows]
@@ -0,0 +1,110 @@
+"""Hammer the SQLite access layer with concurrent readers and writers.
+
+Runs against a scratch copy of data.db so the real catalog is never touched:
+
+    python db_stress.py --readers 32 --writers 4 --seconds 10
+"""
+import argparse
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import database
+import instrumentation
+
+BASE_DIR = Path(__file__).resolve().parent
+
+
+def run(readers, writers, seconds, source):
+    errors = []
+    latencies = {"read": [], "write": []}
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def record(kind, started):
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies[kind].append(elapsed)
+
+    def reader():
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                with database.read_conn() as conn:
+                    database.load_catalog(conn)
+            except Exception as exc:
+                with lock:
+                    errors.append(f"read: {type(exc).__name__}: {exc}")
+                continue
+            record("read", started)
+
+    def writer():
+        rng = random.Random()
+        while not stop.is_set():
+            metal = rng.choice(database.FIXED_METALS)
+            size = rng.choice(database.STONE_SIZES)
+            stone_type = rng.choice(database.STONE_TYPES)
+
+            def update(conn):
+                conn.execute("UPDATE metals SET price=? WHERE name=?", (rng.uniform(100, 5000), metal))
+                conn.execute(f"UPDATE stones SET {stone_type}=? WHERE size=?", (rng.uniform(10, 900), size))
+
+            started = time.perf_counter()
+            try:
+                database.write(update)
+            except Exception as exc:
+                with lock:
+                    errors.append(f"write: {type(exc).__name__}: {exc}")
+                continue
+            record("write", started)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = str(Path(tmp) / "stress.db")
+        shutil.copyfile(source, db_path)
+        database.DB = db_path
+        database.init_db()
+
+        threads = [threading.Thread(target=reader) for _ in range(readers)]
+        threads += [threading.Thread(target=writer) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        database.get_manager().close()
+
+    return latencies, errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--db", default=str(BASE_DIR / "data.db"), help="database to copy (default: data.db)")
+    args = parser.parse_args(argv)
+
+    latencies, errors = run(args.readers, args.writers, args.seconds, args.db)
+
+    for kind, values in latencies.items():
+        values.sort()
+        print(
+            f"{kind:<5} {len(values):7d} ops  {len(values) / args.seconds:8.0f}/s  "
+            f"p50 {instrumentation.percentile(values, 50) * 1000:7.2f} ms  "
+            f"p99 {instrumentation.percentile(values, 99) * 1000:7.2f} ms  "
+            f"max {(values[-1] if values else 0) * 1000:7.2f} ms"
+        )
+    print(f"errors {len(errors)}")
+    for error in sorted(set(errors))[:10]:
+        print(f"  {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
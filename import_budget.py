@@ -0,0 +1,73 @@
+"""Measure what app.py imports on a cold start and check it against a budget.
+
+    python import_budget.py              # default budget, 5 runs
+    python import_budget.py --budget-ms 900 --runs 10
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# modules app.py imports at the top of every cold start
+EAGER_MODULES = ("streamlit", "pandas", "admin", "database", "backgrounds", "pricing", "rates", "pdf_jobs")
+# modules that must only be loaded on first use (PDF button, NBU button)
+LAZY_MODULES = ("pdf_engine", "reportlab", "PIL", "requests")
+DEFAULT_BUDGET_MS = 1500
+
+
+def measure_once():
+    code = "import " + ", ".join(EAGER_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    top_level = {}
+    loaded = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        loaded.add(name.strip().split(".")[0])
+        # top-level imports are the ones without indentation
+        if not name.startswith("  "):
+            top_level[name.strip()] = int(cumulative) / 1000
+    return top_level, loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    runs = [measure_once() for _ in range(args.runs)]
+    totals = [sum(top_level.values()) for top_level, _ in runs]
+    median_total = statistics.median(totals)
+
+    for module in EAGER_MODULES:
+        per_run = [top_level.get(module, 0.0) for top_level, _ in runs]
+        print(f"{module:<12} {statistics.median(per_run):8.1f} ms")
+    print(f"{'total':<12} {median_total:8.1f} ms (budget {args.budget_ms:.0f} ms, median of {args.runs})")
+
+    ok = True
+    leaked = sorted(set(LAZY_MODULES) & set().union(*(loaded for _, loaded in runs)))
+    if leaked:
+        print(f"FAIL: imported eagerly: {', '.join(leaked)}")
+        ok = False
+    if median_total > args.budget_ms:
+        print("FAIL: import budget exceeded")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
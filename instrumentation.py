@@ -0,0 +1,186 @@
+"""Named timing spans, counters and a slow-query log for the hot paths.
+
+Off by default: span() then hands back one shared no-op context manager
+and count() returns after a single flag check. Turn it on with
+INSTRUMENT=1 or set_enabled(True) (the admin diagnostics panel does the
+latter). While on, every finished span and every query slower than
+SLOW_QUERY_MS is logged as one JSON line on the "koshtorys.trace" logger
+and aggregated in memory for stats().
+"""
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from datetime import datetime
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "50"))
+SAMPLES_PER_SPAN = 256
+RECENT_EVENTS = 200
+
+log = logging.getLogger("koshtorys.trace")
+
+_enabled = os.environ.get("INSTRUMENT", "0") == "1"
+_lock = threading.Lock()
+_samples = {}  # span name -> deque of recent durations (seconds)
+_totals = {}  # span name -> [count, total seconds, max seconds]
+_counters = {}
+_events = deque(maxlen=RECENT_EVENTS)
+_current_span = ContextVar("current_span", default=None)
+_NOOP = nullcontext()
+
+
+def is_enabled():
+    return _enabled
+
+
+def set_enabled(enabled):
+    global _enabled
+    if enabled:
+        log.setLevel(logging.INFO)
+        if not log.handlers and not logging.getLogger().handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            log.addHandler(handler)
+    _enabled = bool(enabled)
+
+
+def _emit(event):
+    event = {"ts": datetime.now().isoformat(timespec="milliseconds"), **event}
+    with _lock:
+        _events.append(event)
+    log.info(json.dumps(event, ensure_ascii=False, default=str))
+
+
+def record_duration(name, seconds):
+    """Aggregate a duration under ``name``; for work timed outside span(), e.g. on another thread."""
+    with _lock:
+        samples = _samples.get(name)
+        if samples is None:
+            samples = _samples[name] = deque(maxlen=SAMPLES_PER_SPAN)
+            _totals[name] = [0, 0.0, 0.0]
+        samples.append(seconds)
+        totals = _totals[name]
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+
+
+@contextmanager
+def _span(name, fields):
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as exc:
+        error = type(exc).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        _current_span.reset(token)
+        record_duration(name, elapsed)
+        event = {"event": "span", "name": name, "ms": round(elapsed * 1000, 3), "parent": parent, **fields}
+        if error:
+            event["error"] = error
+        _emit(event)
+
+
+def span(name, **fields):
+    """``with span("pdf.build", rows=12): ...`` times the block when enabled."""
+    if not _enabled:
+        return _NOOP
+    return _span(name, fields)
+
+
+def count(name, n=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def record_query(sql, seconds, params_count=0):
+    count("sql.queries")
+    record_duration("sql", seconds)
+    if seconds * 1000 >= SLOW_QUERY_MS:
+        count("sql.slow")
+        _emit({
+            "event": "slow_query",
+            "ms": round(seconds * 1000, 3),
+            "sql": " ".join(sql.split())[:500],
+            "params": params_count,
+            "parent": _current_span.get(),
+        })
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted sequence; 0.0 when empty."""
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def stats():
+    """Aggregates since the last reset(): spans, counters and the most recent events."""
+    with _lock:
+        spans = []
+        for name, samples in _samples.items():
+            ordered = sorted(samples)
+            calls, total, longest = _totals[name]
+            spans.append({
+                "span": name,
+                "calls": calls,
+                "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+                "max_ms": round(longest * 1000, 3),
+                "total_ms": round(total * 1000, 3),
+            })
+        return {
+            "spans": sorted(spans, key=lambda s: s["total_ms"], reverse=True),
+            "counters": dict(sorted(_counters.items())),
+            "events": list(_events),
+        }
+
+
+def drain():
+    """Return and clear everything recorded so far, for merge() in another process."""
+    with _lock:
+        recorded = {
+            "durations": {name: list(samples) for name, samples in _samples.items()},
+            "counters": dict(_counters),
+            "events": list(_events),
+        }
+        _samples.clear()
+        _totals.clear()
+        _counters.clear()
+        _events.clear()
+    return recorded
+
+
+def merge(recorded):
+    """Add what drain() returned in a render worker to this process's aggregates."""
+    for name, durations in recorded["durations"].items():
+        for seconds in durations:
+            record_duration(name, seconds)
+    for name, n in recorded["counters"].items():
+        count(name, n)
+    with _lock:
+        _events.extend(recorded["events"])
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+        _counters.clear()
+        _events.clear()
+
+
+if _enabled:
+    set_enabled(True)
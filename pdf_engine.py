@@ -1,24 +1,97 @@
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import KeepInFrame, SimpleDocTemplate, Spacer, Table, TableStyle
+from reportlab.platypus import (
+    BaseDocTemplate,
+    Frame,
+    NextPageTemplate,
+    PageTemplate,
+    Paragraph,
+    Spacer,
+    Table,
+    TableStyle,
+)
 from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.styles import ParagraphStyle
+from reportlab import rl_config
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.pdfbase.ttfonts import TTFError
 from reportlab.lib.units import mm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas as pdf_canvas
+from pypdf import PdfReader, PdfWriter
 from PIL import Image
 from pathlib import Path
+from io import BytesIO
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from xml.sax.saxutils import escape
+import hashlib
+import json
+import os
 import tempfile
+import threading
+import uuid
+import zlib
+
+import instrumentation
+
+# binary streams: ASCII85 only makes every image and page stream a quarter larger
+rl_config.useA85 = 0
 
 BASE_DIR = Path(__file__).resolve().parent
 
+FONTS = {
+    "EUkraineRegular": ("e-Ukraine-UltraLight.otf", "Montserrat-Regular.ttf"),
+    "EUkraineBold": ("e-Ukraine-Bold.otf", "Montserrat-Bold.ttf"),
+}
+# remembers which file each font resolved to, so other processes skip the
+# CFF .otf files TTFont cannot parse
+FONT_CACHE_PATH = Path(tempfile.gettempdir()) / "koshtorys" / "fonts.json"
+
+_fonts_lock = threading.Lock()
+_fonts_ready = False
+
+
+def _font_signature(font_path):
+    stat = font_path.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _load_font_cache():
+    try:
+        return json.loads(FONT_CACHE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_font_cache(cache):
+    try:
+        FONT_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        FONT_CACHE_PATH.write_text(json.dumps(cache), encoding="utf-8")
+    except OSError:
+        pass
+
+
+def register_font_with_fallback(font_name, preferred_filename, fallback_filename, cache=None):
+    cache = {} if cache is None else cache
+    candidates = [preferred_filename, fallback_filename]
+
+    cached = cache.get(font_name)
+    if cached and cached.get("file") in candidates:
+        cached_path = BASE_DIR / cached["file"]
+        if cached_path.exists() and _font_signature(cached_path) == cached.get("signature"):
+            candidates.remove(cached["file"])
+            candidates.insert(0, cached["file"])
 
-def register_font_with_fallback(font_name, preferred_filename, fallback_filename):
-    for filename in (preferred_filename, fallback_filename):
+    for filename in candidates:
         font_path = BASE_DIR / filename
         if not font_path.exists():
             continue
         try:
             pdfmetrics.registerFont(TTFont(font_name, str(font_path)))
+            cache[font_name] = {"file": filename, "signature": _font_signature(font_path)}
             return
         except TTFError:
             continue
@@ -28,24 +101,232 @@ def register_font_with_fallback(font_name, preferred_filename, fallback_filename
     )
 
 
-register_font_with_fallback("EUkraineRegular", "e-Ukraine-UltraLight.otf", "Montserrat-Regular.ttf")
-register_font_with_fallback("EUkraineBold", "e-Ukraine-Bold.otf", "Montserrat-Bold.ttf")
-
+def ensure_fonts():
+    global _fonts_ready
+    if _fonts_ready:
+        return
 
-def get_pdf_color(data):
+    with _fonts_lock:
+        if _fonts_ready:
+            return
+        cache = _load_font_cache()
+        before = json.dumps(cache, sort_keys=True)
+        for font_name, (preferred_filename, fallback_filename) in FONTS.items():
+            register_font_with_fallback(font_name, preferred_filename, fallback_filename, cache)
+        if json.dumps(cache, sort_keys=True) != before:
+            _save_font_cache(cache)
+        _fonts_ready = True
+
+
+BACKGROUND_DPI = int(os.environ.get("PDF_BACKGROUND_DPI", "150"))
+# draw the background once into a cached PDF page and merge each quote onto it
+PDF_TEMPLATES = os.environ.get("PDF_TEMPLATES", "1") != "0"
+# compact output: photos (and backgrounds, when smaller) embedded as lossy JPEG
+# and table rules stroked as one path per line style. Off by default: customer
+# photos stay lossless unless PDF_COMPACT=1 is set
+PDF_COMPACT = os.environ.get("PDF_COMPACT", "0") == "1"
+JPEG_QUALITY = int(os.environ.get("PDF_JPEG_QUALITY", "85"))
+
+# (path, dpi, compact) -> ((mtime_ns, size), ImageReader)
+_background_cache = {}
+# (path, dpi, compact) -> ((mtime_ns, size), one-page PDF bytes)
+_template_cache = {}
+_background_lock = threading.Lock()
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _jpeg_reader(img):
+    # ReportLab embeds JPEG bytes as they are (DCTDecode); any other image is
+    # Flate-compressed from raw pixels again on every render
+    buffer = BytesIO()
+    img.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True)
+    buffer.seek(0)
+    return ImageReader(buffer)
+
+
+def _decode_background(path, dpi, compact=False):
+    page_w, page_h = A4
+    target = (round(page_w / 72 * dpi), round(page_h / 72 * dpi))
+    with Image.open(path) as img:
+        img = img.convert("RGB")
+        # the page is stretched to A4 anyway, so anything above the target DPI is wasted
+        if img.width > target[0] or img.height > target[1]:
+            img = img.resize(target, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    reader = ImageReader(img)
+    if compact:
+        # flat colour and gradients deflate better than they JPEG-compress; keep the smaller one
+        jpeg = _jpeg_reader(img)
+        if len(jpeg.fp.getbuffer()) < len(zlib.compress(img.tobytes())):
+            reader = jpeg
+    # decode now so every later page reuses the pixel data
+    reader.getRGBData()
+    return reader
+
+
+def load_background(path, dpi=None, compact=None):
+    dpi = dpi or BACKGROUND_DPI
+    compact = PDF_COMPACT if compact is None else compact
+    key = (str(path), dpi, compact)
+    signature = _file_signature(path)
+
+    cached = _background_cache.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    with _background_lock:
+        cached = _background_cache.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+        reader = _decode_background(path, dpi, compact)
+        _background_cache[key] = (signature, reader)
+        return reader
+
+
+def forget_background(path=None):
+    with _background_lock:
+        for cache in (_background_cache, _template_cache):
+            if path is None:
+                cache.clear()
+                continue
+            for key in [k for k in cache if k[0] == str(path)]:
+                del cache[key]
+
+
+def load_template(path, dpi=None, compact=None):
+    """One A4 page holding only the background, compiled once per background file."""
+    dpi = dpi or BACKGROUND_DPI
+    compact = PDF_COMPACT if compact is None else compact
+    key = (str(path), dpi, compact)
+    signature = _file_signature(path)
+
+    cached = _template_cache.get(key)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    buffer = BytesIO()
+    page = pdf_canvas.Canvas(buffer, pagesize=A4, invariant=1)
+    page.drawImage(load_background(path, dpi, compact), 0, 0, *A4)
+    page.showPage()
+    page.save()
+    template = buffer.getvalue()
+
+    with _background_lock:
+        _template_cache[key] = (signature, template)
+    return template
+
+
+def merge_onto_template(overlay_pdf, template_pdf):
+    template_page = PdfReader(BytesIO(template_pdf)).pages[0]
+    writer = PdfWriter()
+    for page in PdfReader(BytesIO(overlay_pdf)).pages:
+        page = writer.add_page(page)
+        page.merge_page(template_page, over=False)
+        # the merged content stream is written uncompressed otherwise
+        page.compress_content_streams()
+
+    buffer = BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def warm_up(background_paths=()):
+    ensure_fonts()
+    for path in background_paths:
+        load_background(str(path))
+        if PDF_TEMPLATES:
+            load_template(str(path))
+
+
+def get_pdf_color_hex(data):
     value = str(data.get("text_color", "#000000")).strip().lower()
     if value.startswith("#") and len(value) in (4, 7) and all(ch in "0123456789abcdef" for ch in value[1:]):
-        return colors.HexColor(value)
-    return colors.HexColor("#000000")
+        return value
+    return "#000000"
 
 
-def save_uploaded(upload):
+def get_pdf_color(data):
+    return colors.HexColor(get_pdf_color_hex(data))
+
+
+PHOTO_DPI = int(os.environ.get("PDF_PHOTO_DPI", "300"))
+PHOTO_BOX = (50 * mm, 50 * mm)
+PHOTO_CACHE_SIZE = 32
+
+# (sha256, target px, compact) -> ImageReader, most recently used last
+_photo_cache = OrderedDict()
+_photo_lock = threading.Lock()
+
+
+def _photo_digest(upload):
+    digest = hashlib.sha256()
+    if isinstance(upload, (str, Path)):
+        with open(upload, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    elif hasattr(upload, "getbuffer"):
+        # Streamlit's UploadedFile is a BytesIO: hash its buffer without copying it
+        with upload.getbuffer() as view:
+            digest.update(view)
+    else:
+        upload.seek(0)
+        digest.update(upload.read())
+    return digest.hexdigest()
+
+
+def _decode_photo(upload, target, compact=False):
+    if not isinstance(upload, (str, Path)):
+        upload.seek(0)
+    with Image.open(upload) as img:
+        if img.format == "JPEG":
+            # let libjpeg decode at a reduced scale instead of the full 12+ MP frame
+            img.draft("RGB", target)
+        has_alpha = "A" in img.getbands() or "transparency" in img.info
+        img = img.convert("RGBA" if has_alpha else "RGB")
+    if img.width > target[0] or img.height > target[1]:
+        img = img.resize(
+            (min(img.width, target[0]), min(img.height, target[1])),
+            Image.Resampling.LANCZOS,
+        )
+    if compact and has_alpha and img.getchannel("A").getextrema()[0] == 255:
+        # PNGs from phones are often RGBA with nothing transparent
+        img = img.convert("RGB")
+        has_alpha = False
+    # JPEG has no alpha channel, so really transparent photos stay lossless
+    reader = _jpeg_reader(img) if compact and not has_alpha else ImageReader(img)
+    reader.getRGBData()
+    return reader
+
+
+def load_photo(upload, box=PHOTO_BOX, dpi=None, compact=None):
     if not upload:
         return None
-    img = Image.open(upload).convert("RGBA")
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".png")
-    img.save(tmp.name)
-    return tmp.name
+    dpi = dpi or PHOTO_DPI
+    compact = PDF_COMPACT if compact is None else compact
+    target = (round(box[0] / 72 * dpi), round(box[1] / 72 * dpi))
+    key = (_photo_digest(upload), target, compact)
+
+    with _photo_lock:
+        reader = _photo_cache.get(key)
+        if reader is not None:
+            _photo_cache.move_to_end(key)
+            return reader
+
+    reader = _decode_photo(upload, target, compact)
+
+    with _photo_lock:
+        _photo_cache[key] = reader
+        while len(_photo_cache) > PHOTO_CACHE_SIZE:
+            _photo_cache.popitem(last=False)
+    return reader
+
+
+def forget_photos():
+    with _photo_lock:
+        _photo_cache.clear()
 
 
 def section(title):
@@ -70,9 +351,11 @@ def pricing_summary_row(label, value):
     return pricing_row(label, value)
 
 
-def append_pricing_rows(table, rows, ring_title):
+def append_pricing_rows(table, kinds, rows, ring_title):
     table.append(pricing_row(ring_title))
+    kinds.append("section")
     table.append(pricing_row("Товар/послуга", "Ціна", "К-сть", "Знижка", "Вартість"))
+    kinds.append("header")
     for r in rows:
         table.append(pricing_row(
             r["Товар/послуга"],
@@ -81,6 +364,27 @@ def append_pricing_rows(table, rows, ring_title):
             r["Знижка"],
             r["Сума"],
         ))
+        kinds.append("item")
+
+
+def build_pricing_table(data):
+    """Pricing table cells plus the kind of every row, which drives layout and styling."""
+    table = [pricing_row("ЦІНОУТВОРЕННЯ")]
+    kinds = ["section"]
+
+    append_pricing_rows(table, kinds, data["w_pricing_rows"], "Жіноча")
+    append_pricing_rows(table, kinds, data["m_pricing_rows"], "Чоловіча")
+
+    table.append(pricing_summary_row("ЗАГАЛЬНА ВАРТІСТЬ", ""))
+    kinds.append("summary_header")
+    table.append(pricing_summary_row("Жіноча", f'{data["w_total"]:.0f} ₴'))
+    kinds.append("summary")
+    table.append(pricing_summary_row("Чоловіча", f'{data["m_total"]:.0f} ₴'))
+    kinds.append("summary")
+    table.append(pricing_summary_row("Загальна вартість", f'{data["pair_total"]:.0f} ₴'))
+    kinds.append("total")
+
+    return table, tuple(kinds)
 
 
 def append_split_row_line(style, row_idx, line_type, thickness, color, columns):
@@ -88,6 +392,76 @@ def append_split_row_line(style, row_idx, line_type, thickness, color, columns):
         style.append((line_type, (col_idx, row_idx), (col_idx, row_idx), thickness, color))
 
 
+class MergedRulesTable(Table):
+    """Table that strokes its rules as one path per width and colour.
+
+    Table draws every LINEBELOW/LINEABOVE cell segment as a path of its own
+    (``n x y m x y l S``); the split-row grid has hundreds of them.
+    """
+
+    def _drawLines(self):
+        if any(cmd[6] for cmd in self._linecmds):
+            # the canvas does not track the dash pattern, so dashed rules are drawn as usual
+            return super()._drawLines()
+
+        canv = self.canv
+        segments = {}
+
+        def collect(x1, y1, x2, y2):
+            # Table has just set the width, colour, cap and join for this segment
+            style = (self._curweight, self._curcolor, canv._lineCap, canv._lineJoin)
+            segments.setdefault(style, []).append((x1, y1, x2, y2))
+
+        canv.line = collect
+        try:
+            super()._drawLines()
+        finally:
+            del canv.line
+
+        canv.saveState()
+        for (weight, color, cap, join), lines in segments.items():
+            canv.setStrokeColor(color)
+            canv.setLineWidth(weight)
+            canv.setLineCap(cap)
+            canv.setLineJoin(join)
+            canv.lines(lines)
+        canv.restoreState()
+
+
+class PricingTable(Table):
+    """Pricing table whose continuation pages say which ring they continue.
+
+    ``row_kinds`` are the kinds from build_pricing_table(). At every page
+    break the repeated rows are chosen anew: the table title, then the label
+    and the column headings of the ring the next page starts in (the title
+    alone once the summary begins).
+    """
+
+    def __init__(self, data, *args, row_kinds=(), **kwargs):
+        super().__init__(data, *args, **kwargs)
+        self.row_kinds = tuple(row_kinds)
+
+    def _splitRows(self, availHeight, doInRowSplit=0):
+        kinds = self.row_kinds
+        n = self._getFirstPossibleSplitRowPosition(availHeight, ignoreSpans=doInRowSplit)
+        rings = [i for i in range(1, min(n, len(kinds))) if kinds[i] == "section"]
+        if not rings or "summary_header" in kinds[:n + 1]:
+            self.repeatRows = 1
+        else:
+            self.repeatRows = (0, rings[-1], rings[-1] + 1)
+
+        parts = super()._splitRows(availHeight, doInRowSplit)
+        if len(parts) == 2:
+            repeated = range(self.repeatRows) if isinstance(self.repeatRows, int) else self.repeatRows
+            parts[0].row_kinds = kinds[:n]
+            parts[1].row_kinds = tuple(kinds[i] for i in repeated) + kinds[n:]
+        return parts
+
+
+class MergedRulesPricingTable(MergedRulesTable, PricingTable):
+    pass
+
+
 def draw_footer(canvas_obj, doc, data):
     couple_names = data.get("couple_names")
     agreement_number = data.get("agreement_number")
@@ -115,124 +489,96 @@ def draw_footer(canvas_obj, doc, data):
     canvas_obj.restoreState()
 
 
-def generate_pdf(data, out="final.pdf"):
-
-    background = data.get("background_path", "background.png")
-
-    doc = SimpleDocTemplate(
-        out,
-        pagesize=A4,
-        leftMargin=20*mm,
-        rightMargin=20*mm,
-        topMargin=20*mm,
-        bottomMargin=20*mm
+# ================= LAYOUT =================
+
+@dataclass(frozen=True)
+class LayoutTier:
+    name: str
+    body_font_size: float
+    section_font_size: float
+    header_font_size: float
+    row_top_padding: float
+    row_bottom_padding: float
+    section_top_padding: float
+    section_bottom_padding: float
+    title_bottom_padding: float
+    tables_gap: float
+
+
+# from the most spacious to the densest one that is still comfortable to read;
+# quotes that do not fit even the last tier continue on the next page
+LAYOUT_TIERS = (
+    LayoutTier("regular", 9, 11, 8, 3, 5, 8, 5, 6, 8),
+    LayoutTier("compact", 8, 10, 7, 2, 3, 6, 4, 5, 6),
+    LayoutTier("dense", 7, 9, 7, 1.5, 2, 4, 3, 4, 4),
+)
+LEADING = 1.2
+
+PAGE_MARGIN = 20 * mm
+LOGO_SAFE = 55 * mm
+# таблиця завжди під фото
+TABLE_TOP_OFFSET = 95 * mm
+CONTINUATION_TOP = LOGO_SAFE + 5 * mm
+
+PARAMS_COL_WIDTHS = [58 * mm, 4 * mm, 52 * mm, 4 * mm, 52 * mm]
+PRICING_COL_WIDTHS = [64 * mm, 3 * mm, 24 * mm, 3 * mm, 20 * mm, 3 * mm, 20 * mm, 3 * mm, 30 * mm]
+CONTENT_WIDTH = max(sum(PARAMS_COL_WIDTHS), sum(PRICING_COL_WIDTHS))
+FIRST_PAGE_HEIGHT = A4[1] - 2 * PAGE_MARGIN - TABLE_TOP_OFFSET
+LATER_PAGE_HEIGHT = A4[1] - CONTINUATION_TOP - PAGE_MARGIN
+
+PARAMS_ROW_KINDS = ("params_title", "item", "item", "item", "item")
+# font size, top padding, bottom padding attributes of LayoutTier per row kind
+ROW_METRICS = {
+    "params_title": ("section_font_size", "row_top_padding", "title_bottom_padding"),
+    "section": ("section_font_size", "section_top_padding", "section_bottom_padding"),
+    "summary_header": ("section_font_size", "section_top_padding", "section_bottom_padding"),
+    "header": ("header_font_size", "row_top_padding", "row_bottom_padding"),
+    "item": ("body_font_size", "row_top_padding", "row_bottom_padding"),
+    "summary": ("body_font_size", "row_top_padding", "row_bottom_padding"),
+    "total": ("section_font_size", "row_top_padding", "row_bottom_padding"),
+}
+
+
+def row_height(tier, kind):
+    font_size, top, bottom = (getattr(tier, attr) for attr in ROW_METRICS[kind])
+    return font_size * LEADING + top + bottom
+
+
+def layout_height(tier, pricing_kinds):
+    return (
+        sum(row_height(tier, kind) for kind in PARAMS_ROW_KINDS)
+        + tier.tables_gap
+        + sum(row_height(tier, kind) for kind in pricing_kinds)
     )
 
-    elements = []
-    pdf_color = get_pdf_color(data)
-
-    pricing_rows_total = len(data["w_pricing_rows"]) + len(data["m_pricing_rows"])
-    is_compact_layout = pricing_rows_total >= 12
-
-    body_font_size = 8 if is_compact_layout else 9
-    section_font_size = 10 if is_compact_layout else 11
-    header_font_size = 7 if is_compact_layout else 8
-
-    row_top_padding = 2 if is_compact_layout else 3
-    row_bottom_padding = 3 if is_compact_layout else 5
-    section_top_padding = 6 if is_compact_layout else 8
-    section_bottom_padding = 4 if is_compact_layout else 5
-    title_bottom_padding = 5 if is_compact_layout else 6
 
-    # ================= BACKGROUND + PHOTOS =================
-    def draw_bg(canvas, doc):
+def choose_layout(pricing_kinds, available_height=FIRST_PAGE_HEIGHT):
+    for tier in LAYOUT_TIERS:
+        if layout_height(tier, pricing_kinds) <= available_height:
+            return tier
+    return LAYOUT_TIERS[-1]
 
-        PAGE_W, PAGE_H = A4
-        canvas.drawImage(background, 0, 0, PAGE_W, PAGE_H)
 
-        # ===== SAFE ZONE ПІД ЛОГО =====
-        LOGO_SAFE = 55 * mm
+# Styles depend only on the row structure, the layout tier and the colour, so they
+# are built once per combination and shared between quotes; only cell data changes.
+STYLE_CACHE_SIZE = 256
 
-        PHOTO_W = 50 * mm
-        PHOTO_H = 50 * mm
-        GAP = 15 * mm
-        RADIUS = 10
-
-        photo_y = PAGE_H - LOGO_SAFE - PHOTO_H
-
-        # ===== ФУНКЦІЯ ОКРУГЛЕННЯ =====
-        def rounded(img, x, y):
-            canvas.saveState()
-
-            path = canvas.beginPath()
-            path.roundRect(x, y, PHOTO_W, PHOTO_H, RADIUS)
-
-            canvas.clipPath(path, stroke=0, fill=0)
-
-            canvas.drawImage(
-                img,
-                x,
-                y,
-                PHOTO_W,
-                PHOTO_H,
-                preserveAspectRatio=False,
-                mask="auto"
-            )
-
-            canvas.restoreState()
-
-        # ===== ЗБІР ФОТО =====
-        photos = []
-
-        if data["photo1"]:
-            photos.append(save_uploaded(data["photo1"]))
-
-        if data["photo2"]:
-            photos.append(save_uploaded(data["photo2"]))
-
-        count = len(photos)
-
-        # ===== 1 ФОТО =====
-        if count == 1:
-            x = (PAGE_W - PHOTO_W) / 2
-            rounded(photos[0], x, photo_y)
-
-        # ===== 2 ФОТО =====
-        elif count == 2:
-            total_width = PHOTO_W * 2 + GAP
-            start_x = (PAGE_W - total_width) / 2
-
-            rounded(photos[0], start_x, photo_y)
-            rounded(photos[1], start_x + PHOTO_W + GAP, photo_y)
-
-    # таблиця завжди під фото
-    table_top_offset = 95 * mm
-    elements.append(Spacer(1, table_top_offset))
-
-    params_table = [
-        ["ПАРАМЕТРИ", "", "Жіноча", "", "Чоловіча"],
-        ["Розмір", "", data["w_size"], "", data["m_size"]],
-        ["Ширина", "", data["w_width"], "", data["m_width"]],
-        ["Товщина", "", data["w_thickness"], "", data["m_thickness"]],
-        ["Вага", "", f'{data["w_weight"]:.2f} г', "", f'{data["m_weight"]:.2f} г'],
-    ]
-
-    params_col_widths = [58 * mm, 4 * mm, 52 * mm, 4 * mm, 52 * mm]
-    params_tbl = Table(params_table, colWidths=params_col_widths)
-    params_tbl.hAlign = "CENTER"
 
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def params_table_style(tier, color_hex, rows_count):
+    pdf_color = colors.HexColor(color_hex)
     params_style = [
-        ("FONT", (0, 0), (-1, -1), "EUkraineRegular", body_font_size),
-        ("FONT", (0, 0), (-1, 0), "EUkraineBold", section_font_size),
+        ("FONT", (0, 0), (-1, -1), "EUkraineRegular", tier.body_font_size),
+        ("FONT", (0, 0), (-1, 0), "EUkraineBold", tier.section_font_size),
         ("TEXTCOLOR", (0, 0), (-1, -1), pdf_color),
         ("TEXTCOLOR", (0, 0), (-1, 0), pdf_color),
         ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
         ("ALIGN", (0, 0), (0, -1), "LEFT"),
         ("ALIGN", (2, 0), (4, -1), "LEFT"),
         ("ALIGN", (2, 0), (4, 0), "CENTER"),
-        ("TOPPADDING", (0, 0), (-1, -1), row_top_padding),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), row_bottom_padding),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), title_bottom_padding),
+        ("TOPPADDING", (0, 0), (-1, -1), tier.row_top_padding),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), tier.row_bottom_padding),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), tier.title_bottom_padding),
         ("LEFTPADDING", (1, 0), (1, -1), 0),
         ("RIGHTPADDING", (1, 0), (1, -1), 0),
         ("LEFTPADDING", (3, 0), (3, -1), 0),
@@ -242,52 +588,38 @@ def generate_pdf(data, out="final.pdf"):
         ("LINEBELOW", (4, 0), (4, 0), 1, pdf_color),
     ]
 
-    for row_idx in range(1, len(params_table)):
+    for row_idx in range(1, rows_count):
         params_style.append(("LINEBELOW", (0, row_idx), (0, row_idx), 0.3, pdf_color))
         params_style.append(("LINEBELOW", (2, row_idx), (2, row_idx), 0.3, pdf_color))
         params_style.append(("LINEBELOW", (4, row_idx), (4, row_idx), 0.3, pdf_color))
 
-    params_tbl.setStyle(TableStyle(params_style))
-
-    table = []
+    return TableStyle(params_style)
 
-    table.append(pricing_row("ЦІНОУТВОРЕННЯ"))
-
-    append_pricing_rows(table, data["w_pricing_rows"], "Жіноча")
-    append_pricing_rows(table, data["m_pricing_rows"], "Чоловіча")
-
-    idx_summary_header = len(table)
-    table.append(pricing_summary_row("ЗАГАЛЬНА ВАРТІСТЬ", ""))
 
-    idx_w = len(table)
-    table.append(pricing_summary_row("Жіноча", f'{data["w_total"]:.0f} ₴'))
-
-    idx_m = len(table)
-    table.append(pricing_summary_row("Чоловіча", f'{data["m_total"]:.0f} ₴'))
-
-    idx_pair = len(table)
-    table.append(pricing_summary_row("Загальна вартість", f'{data["pair_total"]:.0f} ₴'))
-
-    pricing_col_widths = [64 * mm, 3 * mm, 24 * mm, 3 * mm, 20 * mm, 3 * mm, 20 * mm, 3 * mm, 30 * mm]
-    tbl = Table(table, colWidths=pricing_col_widths)
-    tbl.hAlign = "CENTER"
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def pricing_table_style(kinds, tier, color_hex):
+    pdf_color = colors.HexColor(color_hex)
+    idx_summary_header = kinds.index("summary_header")
+    idx_w, idx_m = [i for i, kind in enumerate(kinds) if kind == "summary"]
+    idx_pair = kinds.index("total")
 
     style = [
-        ("FONT", (0, 0), (-1, -1), "EUkraineRegular", body_font_size),
+        ("FONT", (0, 0), (-1, -1), "EUkraineRegular", tier.body_font_size),
         ("TEXTCOLOR", (0, 0), (-1, -1), pdf_color),
         ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
         ("ALIGN", (0, 0), (0, -1), "LEFT"),
         ("ALIGN", (2, 0), (8, -1), "LEFT"),
-        ("TOPPADDING", (0, 0), (-1, -1), row_top_padding),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), row_bottom_padding),
-        ("FONT", (0, 0), (-1, 0), "EUkraineBold", section_font_size),
+        ("TOPPADDING", (0, 0), (-1, -1), tier.row_top_padding),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), tier.row_bottom_padding),
+        ("FONT", (0, 0), (-1, 0), "EUkraineBold", tier.section_font_size),
         ("ALIGN", (2, 0), (8, 0), "CENTER"),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), title_bottom_padding),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), tier.title_bottom_padding),
         ("TEXTCOLOR", (0, 0), (-1, 0), pdf_color),
         ("SPAN", (2, idx_summary_header), (8, idx_summary_header)),
         ("SPAN", (2, idx_w), (8, idx_w)),
         ("SPAN", (2, idx_m), (8, idx_m)),
         ("SPAN", (2, idx_pair), (8, idx_pair)),
+        ("NOSPLIT", (0, idx_summary_header), (-1, idx_pair)),
     ]
 
     for gap_col in PRICE_GAP_COLS:
@@ -296,35 +628,37 @@ def generate_pdf(data, out="final.pdf"):
 
     append_split_row_line(style, 0, "LINEBELOW", 1, pdf_color, VISIBLE_PRICE_COLS)
 
-    for row_idx in range(1, len(table)):
+    for row_idx in range(1, len(kinds)):
         append_split_row_line(style, row_idx, "LINEBELOW", 0.3, pdf_color, VISIBLE_PRICE_COLS)
 
-    for i,r in enumerate(table):
-        if all(r[col] == "" for col in VISIBLE_PRICE_COLS[1:]) and r[0] != "ЗАГАЛЬНА ВАРТІСТЬ":
+    for i, kind in enumerate(kinds):
+        if kind == "section" and i:
+            # a ring label never ends a page: it stays with its headings and first row
+            style.append(("NOSPLIT", (0, i), (-1, min(i + 2, len(kinds) - 1))))
+        if kind == "section":
             style.append(("SPAN",(0,i),(-1,i)))
-            style.append(("FONT",(0,i),(-1,i),"EUkraineBold",section_font_size))
+            style.append(("FONT",(0,i),(-1,i),"EUkraineBold",tier.section_font_size))
             style.append(("TEXTCOLOR", (0, i), (-1, i), pdf_color))
-            style.append(("TOPPADDING", (0, i), (-1, i), section_top_padding))
-            style.append(("BOTTOMPADDING", (0, i), (-1, i), section_bottom_padding))
+            style.append(("TOPPADDING", (0, i), (-1, i), tier.section_top_padding))
+            style.append(("BOTTOMPADDING", (0, i), (-1, i), tier.section_bottom_padding))
             style.append(("LINEBELOW", (0, i), (8, i), 1, pdf_color))
 
     style += [
-        ("FONT", (0, idx_summary_header), (8, idx_summary_header), "EUkraineBold", section_font_size),
+        ("FONT", (0, idx_summary_header), (8, idx_summary_header), "EUkraineBold", tier.section_font_size),
         ("TEXTCOLOR", (0, idx_summary_header), (8, idx_summary_header), pdf_color),
-        ("TOPPADDING", (0, idx_summary_header), (8, idx_summary_header), section_top_padding),
-        ("BOTTOMPADDING", (0, idx_summary_header), (8, idx_summary_header), section_bottom_padding),
+        ("TOPPADDING", (0, idx_summary_header), (8, idx_summary_header), tier.section_top_padding),
+        ("BOTTOMPADDING", (0, idx_summary_header), (8, idx_summary_header), tier.section_bottom_padding),
         ("LINEBELOW", (0, idx_summary_header), (8, idx_summary_header), 1, pdf_color),
     ]
 
-    pricing_header_indexes = [i for i, r in enumerate(table) if r[0] == "Товар/послуга"]
-    for pricing_header_idx in pricing_header_indexes:
-        style.append(("FONT", (0, pricing_header_idx), (-1, pricing_header_idx), "EUkraineBold", header_font_size))
+    for pricing_header_idx in [i for i, kind in enumerate(kinds) if kind == "header"]:
+        style.append(("FONT", (0, pricing_header_idx), (-1, pricing_header_idx), "EUkraineBold", tier.header_font_size))
         style.append(("TEXTCOLOR", (0, pricing_header_idx), (-1, pricing_header_idx), pdf_color))
         append_split_row_line(style, pricing_header_idx, "LINEABOVE", 0.8, pdf_color, VISIBLE_PRICE_COLS)
 
     style += [
-        ("FONT",(0,idx_pair),(-1,idx_pair),"EUkraineBold",section_font_size),
-        ("FONT", (2, idx_w), (8, idx_pair), "EUkraineBold", body_font_size),
+        ("FONT",(0,idx_pair),(-1,idx_pair),"EUkraineBold",tier.section_font_size),
+        ("FONT", (2, idx_w), (8, idx_pair), "EUkraineBold", tier.body_font_size),
         ("ALIGN", (2, idx_w), (8, idx_pair), "LEFT"),
     ]
 
@@ -333,23 +667,599 @@ def generate_pdf(data, out="final.pdf"):
     for summary_row in (idx_w, idx_m, idx_pair):
         style.append(("LINEBELOW", (2, summary_row), (8, summary_row), 0.8, pdf_color))
 
-    tbl.setStyle(TableStyle(style))
+    return TableStyle(style)
+
+
+# ================= BACKGROUND + PHOTOS =================
+
+def draw_background(canvas, background, compact=None):
+    PAGE_W, PAGE_H = A4
+    with instrumentation.span("pdf.background"):
+        canvas.drawImage(load_background(background, compact=compact), 0, 0, PAGE_W, PAGE_H)
+
+
+def draw_photos(canvas, data, compact=None):
+    PAGE_W, PAGE_H = A4
+
+    PHOTO_W, PHOTO_H = PHOTO_BOX
+    GAP = 15 * mm
+    RADIUS = 10
+
+    photo_y = PAGE_H - LOGO_SAFE - PHOTO_H
+
+    # ===== ФУНКЦІЯ ОКРУГЛЕННЯ =====
+    def rounded(img, x, y):
+        canvas.saveState()
+
+        path = canvas.beginPath()
+        path.roundRect(x, y, PHOTO_W, PHOTO_H, RADIUS)
+
+        canvas.clipPath(path, stroke=0, fill=0)
+
+        canvas.drawImage(
+            img,
+            x,
+            y,
+            PHOTO_W,
+            PHOTO_H,
+            preserveAspectRatio=False,
+            mask="auto"
+        )
+
+        canvas.restoreState()
+
+    # ===== ЗБІР ФОТО =====
+    photos = []
+
+    with instrumentation.span("pdf.photos.load"):
+        if data["photo1"]:
+            photos.append(load_photo(data["photo1"], compact=compact))
+
+        if data["photo2"]:
+            photos.append(load_photo(data["photo2"], compact=compact))
+
+    count = len(photos)
+
+    with instrumentation.span("pdf.photos.draw", photos=count):
+        # ===== 1 ФОТО =====
+        if count == 1:
+            x = (PAGE_W - PHOTO_W) / 2
+            rounded(photos[0], x, photo_y)
+
+        # ===== 2 ФОТО =====
+        elif count == 2:
+            total_width = PHOTO_W * 2 + GAP
+            start_x = (PAGE_W - total_width) / 2
+
+            rounded(photos[0], start_x, photo_y)
+            rounded(photos[1], start_x + PHOTO_W + GAP, photo_y)
+
+
+# ================= PDF CACHE =================
+
+PDF_CACHE = os.environ.get("PDF_CACHE", "1") != "0"
+PDF_CACHE_MEMORY_BYTES = int(os.environ.get("PDF_CACHE_MEMORY_BYTES", str(32 * 1024 * 1024)))
+PDF_CACHE_DISK_BYTES = int(os.environ.get("PDF_CACHE_DISK_BYTES", str(256 * 1024 * 1024)))
+PDF_CACHE_DIR = Path(os.environ.get("PDF_CACHE_DIR", Path(tempfile.gettempdir()) / "koshtorys" / "pdf-cache"))
+# bump whenever the rendered output changes for the same input
+PDF_CACHE_VERSION = 3
+
+# inputs that are hashed by content or file signature instead of by value
+UNHASHED_KEYS = ("photo1", "photo2", "background_path", "background_file", "text_color")
+
+_pdf_cache = OrderedDict()
+_pdf_cache_bytes = 0
+_pdf_cache_lock = threading.Lock()
+
+
+def pdf_cache_key(data, use_template, compact=False):
+    digest = hashlib.sha256()
+    payload = {k: v for k, v in data.items() if k not in UNHASHED_KEYS}
+    digest.update(json.dumps(
+        [PDF_CACHE_VERSION, use_template, compact, compact and JPEG_QUALITY, BACKGROUND_DPI, PHOTO_DPI, payload],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    ).encode("utf-8"))
+
+    for key in ("photo1", "photo2"):
+        photo = data.get(key)
+        digest.update((_photo_digest(photo) if photo else "-").encode())
+
+    background = data.get("background_path", "background.png")
+    digest.update(f"{background}:{_file_signature(background)}".encode())
+    digest.update(get_pdf_color_hex(data).encode())
+    return digest.hexdigest()
+
+
+def _cache_dir():
+    # the PDFs carry customer names and contract numbers: keep them private to this user
+    PDF_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+    stat = PDF_CACHE_DIR.stat()
+    if hasattr(os, "getuid") and stat.st_uid != os.getuid():
+        raise PermissionError(f"{PDF_CACHE_DIR} belongs to another user")
+    if stat.st_mode & 0o077:
+        os.chmod(PDF_CACHE_DIR, 0o700)
+    return PDF_CACHE_DIR
+
+
+def _cache_get(key):
+    with _pdf_cache_lock:
+        pdf_bytes = _pdf_cache.get(key)
+        if pdf_bytes is not None:
+            _pdf_cache.move_to_end(key)
+            return pdf_bytes
+
+    try:
+        path = _cache_dir() / f"{key}.pdf"
+        pdf_bytes = path.read_bytes()
+        # mtime doubles as the last-used time for disk eviction
+        os.utime(path)
+    except OSError:
+        return None
+    _remember(key, pdf_bytes)
+    return pdf_bytes
+
 
-    available_table_height = doc.height - table_top_offset
-    fit_table = KeepInFrame(
-        maxWidth=doc.width,
-        maxHeight=available_table_height,
-        content=[params_tbl, Spacer(1, 6 if is_compact_layout else 8), tbl],
-        mode="shrink",
-        hAlign="CENTER",
+def _remember(key, pdf_bytes):
+    global _pdf_cache_bytes
+    with _pdf_cache_lock:
+        if key in _pdf_cache or len(pdf_bytes) > PDF_CACHE_MEMORY_BYTES:
+            return
+        _pdf_cache[key] = pdf_bytes
+        _pdf_cache_bytes += len(pdf_bytes)
+        while _pdf_cache_bytes > PDF_CACHE_MEMORY_BYTES:
+            _, evicted = _pdf_cache.popitem(last=False)
+            _pdf_cache_bytes -= len(evicted)
+
+
+def _cache_put(key, pdf_bytes):
+    _remember(key, pdf_bytes)
+    try:
+        path = _cache_dir() / f"{key}.pdf"
+        tmp = path.with_suffix(f".{uuid.uuid4().hex}.tmp")
+        with os.fdopen(os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp, path)
+        _trim_disk_cache()
+    except OSError:
+        pass
+
+
+def _trim_disk_cache():
+    entries = []
+    total = 0
+    for path in PDF_CACHE_DIR.glob("*.pdf"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+        total += stat.st_size
+
+    for _, size, path in sorted(entries):
+        if total <= PDF_CACHE_DISK_BYTES:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+
+
+def clear_pdf_cache(disk=True):
+    global _pdf_cache_bytes
+    with _pdf_cache_lock:
+        _pdf_cache.clear()
+        _pdf_cache_bytes = 0
+    if disk:
+        for path in PDF_CACHE_DIR.glob("*.pdf"):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def build_doc(target, on_first_page, on_later_pages, first_page_height=FIRST_PAGE_HEIGHT):
+    page_w, page_h = A4
+    x = (page_w - CONTENT_WIDTH) / 2
+
+    first_frame = Frame(
+        x, PAGE_MARGIN, CONTENT_WIDTH, first_page_height,
+        leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0, id="first",
+    )
+    later_frame = Frame(
+        x, PAGE_MARGIN, CONTENT_WIDTH, LATER_PAGE_HEIGHT,
+        leftPadding=0, rightPadding=0, topPadding=0, bottomPadding=0, id="later",
     )
 
-    elements.append(fit_table)
+    doc = BaseDocTemplate(
+        target,
+        pagesize=A4,
+        leftMargin=PAGE_MARGIN,
+        rightMargin=PAGE_MARGIN,
+        topMargin=PAGE_MARGIN,
+        bottomMargin=PAGE_MARGIN,
+        # no timestamps or random document ids: equal input gives equal bytes
+        invariant=1,
+    )
+    doc.addPageTemplates([
+        PageTemplate(id="first", frames=[first_frame], onPage=on_first_page),
+        PageTemplate(id="later", frames=[later_frame], onPage=on_later_pages),
+    ])
+    return doc
+
+
+def generate_pdf(data, out=None, use_template=None, use_cache=None, compact=None):
+    """Render the quote in memory and return the PDF bytes.
+
+    When ``out`` is given the same bytes are also written to that path.
+    With ``use_template`` (default: PDF_TEMPLATES) only the quote overlay is
+    drawn and merged onto the cached background page.
+    With ``use_cache`` (default: PDF_CACHE) identical inputs return the bytes
+    of an earlier render from memory or from PDF_CACHE_DIR.
+    With ``compact`` (default: PDF_COMPACT, off) photos are re-encoded as lossy
+    JPEG and the table rules drawn as merged paths; see pdf_size_report().
+    """
+    use_template = PDF_TEMPLATES if use_template is None else use_template
+    use_cache = PDF_CACHE if use_cache is None else use_cache
+    compact = PDF_COMPACT if compact is None else compact
+
+    with instrumentation.span("pdf.generate", template=use_template, cache=use_cache, compact=compact):
+        cache_key = pdf_cache_key(data, use_template, compact) if use_cache else None
+        pdf_bytes = _cache_get(cache_key) if cache_key else None
+        if cache_key:
+            instrumentation.count("pdf.cache_hits" if pdf_bytes is not None else "pdf.cache_misses")
+        if pdf_bytes is None:
+            pdf_bytes = render_pdf(data, use_template, compact)
+            if cache_key:
+                _cache_put(cache_key, pdf_bytes)
+
+    if out:
+        Path(out).write_bytes(pdf_bytes)
+    return pdf_bytes
+
+
+def _full_fonts(pdf_bytes):
+    """Embedded fonts whose name lacks the ``ABCDEF+`` subset tag."""
+    full = set()
+    for page in PdfReader(BytesIO(pdf_bytes)).pages:
+        fonts = page.get("/Resources", {}).get("/Font", {})
+        for font in fonts.values():
+            font = font.get_object()
+            descriptor = font.get("/FontDescriptor")
+            if descriptor is None and "/DescendantFonts" in font:
+                descriptor = font["/DescendantFonts"][0].get_object().get("/FontDescriptor")
+            if descriptor is None:
+                continue  # one of the 14 standard fonts, nothing embedded
+            descriptor = descriptor.get_object()
+            embedded = any(k in descriptor for k in ("/FontFile", "/FontFile2", "/FontFile3"))
+            name = str(font.get("/BaseFont", ""))
+            if embedded and not (len(name) > 8 and name[7] == "+" and name[1:7].isupper()):
+                full.add(name)
+    return sorted(full)
+
+
+def _jpeg_images(pdf_bytes):
+    """Number of distinct DCT-encoded (JPEG) image XObjects."""
+    seen = set()
+    for page in PdfReader(BytesIO(pdf_bytes)).pages:
+        xobjects = page.get("/Resources", {}).get("/XObject", {})
+        for ref in xobjects.values():
+            image = ref.get_object()
+            filters = image.get("/Filter", ())
+            filters = [filters] if isinstance(filters, str) else list(filters)
+            if image.get("/Subtype") == "/Image" and "/DCTDecode" in filters:
+                seen.add(getattr(ref, "idnum", id(image)))
+    return len(seen)
+
+
+def pdf_size_report(data, use_template=None):
+    """Render ``data`` in the standard and in the compact mode and compare.
+
+    Nearly all of the saving comes from re-encoding the photos as JPEG at
+    JPEG_QUALITY, which is lossy; without photos the two sizes are within a
+    few percent. ``lossy_images`` counts the images the compact render
+    embeds as JPEG on top of those the standard one does.
+    ``full_fonts`` lists fonts embedded whole instead of as a subset; ReportLab
+    subsets every TTF it embeds, so anything here is a regression.
+    """
+    use_template = PDF_TEMPLATES if use_template is None else use_template
+    standard = render_pdf(data, use_template, compact=False)
+    compact = render_pdf(data, use_template, compact=True)
+    return {
+        "standard_bytes": len(standard),
+        "compact_bytes": len(compact),
+        "ratio": round(len(standard) / len(compact), 1),
+        "lossy_images": _jpeg_images(compact) - _jpeg_images(standard),
+        "jpeg_quality": JPEG_QUALITY,
+        "full_fonts": _full_fonts(standard) + _full_fonts(compact),
+    }
+
+
+def render_pdf(data, use_template, compact=False):
+    ensure_fonts()
+    color_hex = get_pdf_color_hex(data)
+
+    with instrumentation.span("pdf.tables"):
+        table, kinds = build_pricing_table(data)
+        tier = choose_layout(kinds)
+    instrumentation.count(f"pdf.layout.{tier.name}")
+
+    params_table = [
+        ["ПАРАМЕТРИ", "", "Жіноча", "", "Чоловіча"],
+        ["Розмір", "", data["w_size"], "", data["m_size"]],
+        ["Ширина", "", data["w_width"], "", data["m_width"]],
+        ["Товщина", "", data["w_thickness"], "", data["m_thickness"]],
+        ["Вага", "", f'{data["w_weight"]:.2f} г', "", f'{data["m_weight"]:.2f} г'],
+    ]
+
+    table_class = MergedRulesTable if compact else Table
+    params_tbl = table_class(params_table, colWidths=PARAMS_COL_WIDTHS)
+    params_tbl.hAlign = "CENTER"
+    params_tbl.setStyle(params_table_style(tier, color_hex, len(params_table)))
+
+    pricing_class = MergedRulesPricingTable if compact else PricingTable
+    tbl = pricing_class(table, colWidths=PRICING_COL_WIDTHS, repeatRows=1, row_kinds=kinds)
+    tbl.hAlign = "CENTER"
+    tbl.setStyle(pricing_table_style(kinds, tier, color_hex))
+
+    elements = [
+        NextPageTemplate("later"),
+        params_tbl,
+        Spacer(1, tier.tables_gap),
+        tbl,
+    ]
+    return build_pdf(
+        elements,
+        data,
+        use_template,
+        compact,
+        on_first_page=lambda canvas_obj: draw_photos(canvas_obj, data, compact),
+        rows=len(kinds),
+    )
+
+
+def build_pdf(elements, data, use_template, compact, on_first_page=None,
+              first_page_height=FIRST_PAGE_HEIGHT, **span_fields):
+    """Lay ``elements`` out on pages with the background and footer of ``data``."""
+    background = data.get("background_path", "background.png")
+    buffer = BytesIO()
 
     def draw_first_page(canvas_obj, page_doc):
-        draw_bg(canvas_obj, page_doc)
+        if not use_template:
+            draw_background(canvas_obj, background, compact)
+        if on_first_page:
+            on_first_page(canvas_obj)
+        draw_footer(canvas_obj, page_doc, data)
+
+    def draw_later_page(canvas_obj, page_doc):
+        if not use_template:
+            draw_background(canvas_obj, background, compact)
         draw_footer(canvas_obj, page_doc, data)
 
-    doc.build(elements, onFirstPage=draw_first_page)
+    doc = build_doc(buffer, draw_first_page, draw_later_page, first_page_height)
+    with instrumentation.span("pdf.build", **span_fields):
+        doc.build(elements)
 
-    return out
+    pdf_bytes = buffer.getvalue()
+    if use_template:
+        with instrumentation.span("pdf.template"):
+            template = load_template(background, compact=compact)
+        with instrumentation.span("pdf.merge"):
+            pdf_bytes = merge_onto_template(pdf_bytes, template)
+    return pdf_bytes
+
+
+# ================= PRICE SHEET =================
+
+SHEET_TIER = LAYOUT_TIERS[1]
+SHEET_WEIGHT_COL = 28 * mm
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def price_sheet_style(tier, color_hex):
+    pdf_color = colors.HexColor(color_hex)
+    return TableStyle([
+        ("FONT", (0, 0), (-1, -1), "EUkraineRegular", tier.body_font_size),
+        ("TEXTCOLOR", (0, 0), (-1, -1), pdf_color),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+        ("TOPPADDING", (0, 0), (-1, -1), tier.row_top_padding),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), tier.row_bottom_padding),
+        # row 0: metal and its price per gram, row 1: work types
+        ("SPAN", (0, 0), (-1, 0)),
+        ("ALIGN", (0, 0), (-1, 0), "LEFT"),
+        ("FONT", (0, 0), (-1, 0), "EUkraineBold", tier.section_font_size),
+        ("TOPPADDING", (0, 0), (-1, 0), tier.section_top_padding),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), tier.section_bottom_padding),
+        ("LINEBELOW", (0, 0), (-1, 0), 1, pdf_color),
+        ("FONT", (0, 1), (-1, 1), "EUkraineBold", tier.header_font_size),
+        ("LINEBELOW", (0, 1), (-1, 1), 0.8, pdf_color),
+        ("LINEBELOW", (0, 2), (-1, -1), 0.3, pdf_color),
+    ])
+
+
+def price_sheet_tables(grid, color_hex, compact=False):
+    table_class = MergedRulesTable if compact else Table
+    columns = len(grid.jeweler_types)
+    value_width = (CONTENT_WIDTH - SHEET_WEIGHT_COL) / max(columns, 1)
+    weights = [f"{w:g} г" for w in grid.weights]
+    style = price_sheet_style(SHEET_TIER, color_hex)
+
+    tables = []
+    for metal, metal_price, totals in zip(grid.metals, grid.metal_prices, grid.totals):
+        rows = [
+            [f"{metal} · {metal_price:.0f} ₴/г"] + [""] * columns,
+            ["Вага", *grid.jeweler_types],
+        ]
+        # totals is (work types, weights); one row per weight
+        rows += [[weight, *(f"{v:.0f} ₴" for v in row)] for weight, row in zip(weights, totals.T)]
+        tbl = table_class(rows, colWidths=[SHEET_WEIGHT_COL] + [value_width] * columns, repeatRows=2)
+        tbl.hAlign = "CENTER"
+        tbl.setStyle(style)
+        tables.append(tbl)
+    return tables
+
+
+def generate_price_sheet(grid, data, out=None, use_template=None, compact=None):
+    """Render a pricing.PriceGrid as a price list: a table per metal, a row per weight.
+
+    ``data`` supplies what a quote would: text_color, background_path and the
+    footer fields. Sheets are not kept in the PDF cache.
+    """
+    use_template = PDF_TEMPLATES if use_template is None else use_template
+    compact = PDF_COMPACT if compact is None else compact
+    ensure_fonts()
+    color_hex = get_pdf_color_hex(data)
+
+    extras = [text for text in (
+        f"профіль «{grid.profile}»" if grid.profile else "",
+        f"покриття «{grid.coating}»" if grid.coating else "",
+    ) if text]
+    subtitle = "Ціна однієї обручки без знижок" + (f", з урахуванням: {', '.join(extras)}" if extras else "")
+
+    with instrumentation.span("pdf.price_sheet", cells=grid.cells, compact=compact):
+        heading = Table(
+            [["ПРАЙС-ЛИСТ"], [subtitle]],
+            colWidths=[CONTENT_WIDTH],
+            style=TableStyle([
+                ("FONT", (0, 0), (0, 0), "EUkraineBold", SHEET_TIER.section_font_size + 4),
+                ("FONT", (0, 1), (0, 1), "EUkraineRegular", SHEET_TIER.body_font_size),
+                ("TEXTCOLOR", (0, 0), (-1, -1), colors.HexColor(color_hex)),
+                ("LEFTPADDING", (0, 0), (-1, -1), 0),
+                ("BOTTOMPADDING", (0, 0), (0, 0), SHEET_TIER.title_bottom_padding),
+            ]),
+        )
+        elements = [NextPageTemplate("later"), heading]
+        for tbl in price_sheet_tables(grid, color_hex, compact):
+            elements += [Spacer(1, SHEET_TIER.section_top_padding * 2), tbl]
+
+        # no photos on a sheet: the first page starts right below the logo like the others
+        pdf_bytes = build_pdf(
+            elements, data, use_template, compact,
+            first_page_height=LATER_PAGE_HEIGHT, rows=grid.totals.shape[0] * grid.totals.shape[2],
+        )
+
+    if out:
+        Path(out).write_bytes(pdf_bytes)
+    return pdf_bytes
+
+
+# ================= VARIANT COMPARISON =================
+
+COMPARISON_LABEL_COL = 50 * mm
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def comparison_table_style(kinds, tier, color_hex):
+    # fonts and alignment live in comparison_cell_styles(); cells are paragraphs
+    pdf_color = colors.HexColor(color_hex)
+    style = [
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("TOPPADDING", (0, 0), (-1, -1), tier.row_top_padding),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), tier.row_bottom_padding),
+        # row 0: variant names
+        ("BOTTOMPADDING", (0, 0), (-1, 0), tier.title_bottom_padding),
+        ("LINEBELOW", (0, 0), (-1, 0), 1, pdf_color),
+    ]
+    for i, kind in enumerate(kinds, start=1):
+        if kind == "section":
+            style += [
+                ("TOPPADDING", (0, i), (-1, i), tier.section_top_padding),
+                ("BOTTOMPADDING", (0, i), (-1, i), tier.section_bottom_padding),
+                ("LINEBELOW", (0, i), (-1, i), 1, pdf_color),
+            ]
+        elif kind == "header":
+            style.append(("LINEBELOW", (0, i), (-1, i), 0.8, pdf_color))
+        elif kind in ("subtotal", "total"):
+            style += [
+                ("LINEABOVE", (0, i), (-1, i), 0.8, pdf_color),
+                ("LINEBELOW", (0, i), (-1, i), 0.8, pdf_color),
+            ]
+        else:
+            style.append(("LINEBELOW", (0, i), (-1, i), 0.3, pdf_color))
+    return TableStyle(style)
+
+
+@lru_cache(maxsize=STYLE_CACHE_SIZE)
+def comparison_cell_styles(kind, tier, color_hex):
+    """(label, value) paragraph styles for a row; cells wrap instead of running into the next column."""
+    if kind in ("names", "section", "total"):
+        font, size = "EUkraineBold", tier.section_font_size
+    elif kind == "header":
+        font, size = "EUkraineBold", tier.header_font_size
+    elif kind == "subtotal":
+        font, size = "EUkraineBold", tier.body_font_size
+    else:
+        font, size = "EUkraineRegular", tier.body_font_size
+    label = ParagraphStyle(
+        f"comparison-{kind}",
+        fontName=font,
+        fontSize=size,
+        leading=size * LEADING,
+        textColor=colors.HexColor(color_hex),
+    )
+    return label, ParagraphStyle(f"comparison-{kind}-value", parent=label, alignment=TA_CENTER)
+
+
+def comparison_row(kind, label, cells, tier, color_hex):
+    label_style, value_style = comparison_cell_styles(kind, tier, color_hex)
+    return [Paragraph(escape(str(label)), label_style)] + [Paragraph(escape(str(cell)), value_style) for cell in cells]
+
+
+def generate_comparison_pdf(data, out=None, use_template=None, compact=None):
+    """Render several variants of one pair side by side in a single document.
+
+    ``data`` holds the shared quote fields (photos, sizes, colour, background,
+    footer) plus ``variant_names`` and ``variant_rows`` from
+    pricing.comparison_rows(); each variant is one column.
+    """
+    use_template = PDF_TEMPLATES if use_template is None else use_template
+    compact = PDF_COMPACT if compact is None else compact
+    ensure_fonts()
+    color_hex = get_pdf_color_hex(data)
+    tier = SHEET_TIER
+    table_class = MergedRulesTable if compact else Table
+
+    names = list(data["variant_names"])
+    rows = data["variant_rows"]
+    kinds = tuple(kind for kind, _, _ in rows)
+
+    with instrumentation.span("pdf.comparison", variants=len(names), compact=compact):
+        params_table = [
+            ["ПАРАМЕТРИ", "", "Жіноча", "", "Чоловіча"],
+            ["Розмір", "", data.get("w_size", ""), "", data.get("m_size", "")],
+            ["Ширина", "", data.get("w_width", ""), "", data.get("m_width", "")],
+            ["Товщина", "", data.get("w_thickness", ""), "", data.get("m_thickness", "")],
+        ]
+        params_tbl = table_class(params_table, colWidths=PARAMS_COL_WIDTHS)
+        params_tbl.hAlign = "CENTER"
+        params_tbl.setStyle(params_table_style(tier, color_hex, len(params_table)))
+
+        value_width = (CONTENT_WIDTH - COMPARISON_LABEL_COL) / max(len(names), 1)
+        table = [comparison_row("names", "ВАРІАНТИ", names, tier, color_hex)]
+        table += [comparison_row(kind, label, cells, tier, color_hex) for kind, label, cells in rows]
+        tbl = table_class(table, colWidths=[COMPARISON_LABEL_COL] + [value_width] * len(names), repeatRows=1)
+        tbl.hAlign = "CENTER"
+        tbl.setStyle(comparison_table_style(kinds, tier, color_hex))
+
+        elements = [
+            NextPageTemplate("later"),
+            params_tbl,
+            Spacer(1, tier.tables_gap),
+            tbl,
+        ]
+        # one document: the background, the photos and the fonts are embedded once for all variants
+        pdf_bytes = build_pdf(
+            elements,
+            data,
+            use_template,
+            compact,
+            on_first_page=lambda canvas_obj: draw_photos(canvas_obj, data, compact),
+            rows=len(table),
+        )
+
+    if out:
+        Path(out).write_bytes(pdf_bytes)
+    return pdf_bytes
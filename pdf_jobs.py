@@ -0,0 +1,327 @@
+"""Render PDFs off the Streamlit thread in a pool of pre-warmed worker processes.
+
+    queue = get_render_queue()
+    job_id = queue.submit(data)          # returns at once, raises QueueFull when saturated
+    job_id = queue.submit_price_sheet(grid, data)
+    job_id = queue.submit_comparison(data)   # data["variant_rows"] from pricing.comparison_rows()
+    job = queue.job(job_id)              # poll: job.state, job.position, job.result()
+
+Workers start with the fonts registered and the active background decoded,
+so a job only pays for the quote itself. PDF_WORKERS sets the number of
+processes (0 renders on a single background thread of this process instead)
+and PDF_QUEUE_DEPTH the number of unfinished jobs accepted at once.
+"""
+import os
+import pickle
+import queue
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+
+import instrumentation
+
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", str(min(2, os.cpu_count() or 1))))
+PDF_QUEUE_DEPTH = int(os.environ.get("PDF_QUEUE_DEPTH", "16"))
+# finished jobs stay downloadable this long
+JOB_TTL_SECONDS = 15 * 60
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+PHOTO_KEYS = ("photo1", "photo2")
+BASE_DIR = Path(__file__).resolve().parent
+
+
+class QueueFull(Exception):
+    pass
+
+
+class WorkerDied(Exception):
+    pass
+
+
+def _with_photo_files(data):
+    data = dict(data)
+    for key in PHOTO_KEYS:
+        if data.get(key) is not None:
+            data[key] = BytesIO(data[key])
+    return data
+
+
+def _render(data):
+    import pdf_engine
+
+    started = time.perf_counter()
+    return pdf_engine.generate_pdf(_with_photo_files(data)), time.perf_counter() - started
+
+
+def _render_comparison(data):
+    import pdf_engine
+
+    started = time.perf_counter()
+    return pdf_engine.generate_comparison_pdf(_with_photo_files(data)), time.perf_counter() - started
+
+
+def _render_price_sheet(grid, data):
+    import pdf_engine
+
+    started = time.perf_counter()
+    return pdf_engine.generate_price_sheet(grid, data), time.perf_counter() - started
+
+
+def _worker_main():
+    """Entry point of a render process: warm up, then answer pickled calls on stdin."""
+    import pdf_engine
+
+    requests, replies = sys.stdin.buffer, sys.stdout.buffer
+    # a stray print must not end up in the reply stream
+    sys.stdout = sys.stderr
+    pdf_engine.warm_up(pickle.load(requests))
+    while True:
+        try:
+            fn, args, instrumented = pickle.load(requests)
+        except EOFError:
+            return
+        # follow the parent's diagnostics toggle; what this call records goes back with the reply
+        if instrumented != instrumentation.is_enabled():
+            instrumentation.set_enabled(instrumented)
+        try:
+            reply = (True, fn(*args))
+        except Exception as exc:
+            reply = (False, exc)
+        recorded = instrumentation.drain() if instrumented else None
+        try:
+            payload = pickle.dumps((*reply, recorded))
+        except Exception:
+            payload = pickle.dumps((False, RuntimeError(repr(reply[1])), recorded))
+        replies.write(payload)
+        replies.flush()
+
+
+class _Worker:
+    """One render process, started through _worker_main().
+
+    An explicit entry point rather than multiprocessing: a spawned process
+    re-runs the parent's __main__, which under Streamlit is the whole app.py.
+    """
+
+    def __init__(self, background_paths):
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", f"import sys; sys.path.insert(0, {str(BASE_DIR)!r}); import pdf_jobs; pdf_jobs._worker_main()"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        self._send(list(background_paths))
+
+    def _send(self, obj):
+        pickle.dump(obj, self.process.stdin)
+        self.process.stdin.flush()
+
+    def call(self, fn, *args):
+        try:
+            self._send((fn, args, instrumentation.is_enabled()))
+            ok, result, recorded = pickle.load(self.process.stdout)
+        except (EOFError, OSError, pickle.UnpicklingError) as exc:
+            raise WorkerDied(f"процес PDF {self.process.pid} завершився: {exc}") from exc
+        if recorded:
+            instrumentation.merge(recorded)
+        if not ok:
+            raise result
+        return result
+
+    def close(self, timeout=5):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout)
+        except (OSError, subprocess.TimeoutExpired):
+            self.process.kill()
+            self.process.wait()
+
+def _portable(data):
+    # uploads (Streamlit UploadedFile, open files) do not cross process boundaries; their bytes do
+    data = dict(data)
+    for key in PHOTO_KEYS:
+        photo = data.get(key)
+        if photo is not None:
+            data[key] = photo.getvalue() if hasattr(photo, "getvalue") else bytes(photo)
+    return data
+
+
+@dataclass
+class Job:
+    id: str
+    data: dict
+    future: object
+    submitted_at: float
+    sequence: int
+    context: object = None
+    finished_at: float | None = None
+    render_seconds: float | None = None
+    position: int = 0
+
+    @property
+    def state(self):
+        if not self.future.done():
+            return RUNNING if self.future.running() else QUEUED
+        return FAILED if self.future.exception() is not None else DONE
+
+    def result(self):
+        return self.future.result()[0]
+
+    def error(self):
+        return self.future.exception()
+
+
+class RenderQueue:
+    def __init__(self, workers=PDF_WORKERS, max_depth=PDF_QUEUE_DEPTH, background_paths=()):
+        self.workers = workers
+        self.max_depth = max_depth
+        self.background_paths = [str(p) for p in background_paths]
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._sequence = 0
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "peak_depth": 0}
+        self._render_times = []
+        self._idle = queue.SimpleQueue()
+        self._executor = self._start()
+
+    def _start(self):
+        if self.workers <= 0:
+            import pdf_engine
+
+            return ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="pdf-render",
+                initializer=pdf_engine.warm_up,
+                initargs=(self.background_paths,),
+            )
+
+        # processes, not threads: a render holds the GIL. They start (and warm up) right
+        # away; each job thread borrows an idle one for the length of a call.
+        for _ in range(self.workers):
+            self._idle.put(_Worker(self.background_paths))
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pdf-render")
+
+    def _call(self, fn, *args):
+        worker = self._idle.get()
+        try:
+            return worker.call(fn, *args)
+        except WorkerDied:
+            # e.g. killed for memory; this job fails, the next one gets a fresh process
+            worker.close(timeout=0)
+            worker = _Worker(self.background_paths)
+            raise
+        finally:
+            self._idle.put(worker)
+
+    def _submit(self, fn, *args):
+        if self.workers <= 0:
+            return self._executor.submit(fn, *args)
+        return self._executor.submit(self._call, fn, *args)
+
+    def _depth(self):
+        return sum(1 for job in self._jobs.values() if not job.future.done())
+
+    def _prune(self):
+        cutoff = time.monotonic() - JOB_TTL_SECONDS
+        for job_id in [k for k, job in self._jobs.items() if job.finished_at and job.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, data, context=None):
+        """Queue a render of ``data``; ``context`` is kept on the job for the caller."""
+        portable = _portable(data)
+        return self._enqueue(data, context, _render, portable)
+
+    def submit_comparison(self, data, context=None):
+        """Queue one PDF comparing the variants in ``data``; see pdf_engine.generate_comparison_pdf()."""
+        return self._enqueue(data, context, _render_comparison, _portable(data))
+
+    def submit_price_sheet(self, grid, data, context=None):
+        """Queue a pricing.PriceGrid sheet; ``data`` gives its colour, background and footer."""
+        return self._enqueue(data, context, _render_price_sheet, grid, data)
+
+    def _enqueue(self, data, context, fn, *args):
+        with self._lock:
+            self._prune()
+            depth = self._depth()
+            if depth >= self.max_depth:
+                self._stats["rejected"] += 1
+                instrumentation.count("pdf_jobs.rejected")
+                raise QueueFull(f"у черзі вже {depth} PDF, спробуйте за хвилину")
+
+            future = self._submit(fn, *args)
+
+            self._sequence += 1
+            job = Job(uuid.uuid4().hex, data, future, time.monotonic(), self._sequence, context)
+            self._jobs[job.id] = job
+            self._stats["submitted"] += 1
+            self._stats["peak_depth"] = max(self._stats["peak_depth"], depth + 1)
+
+        instrumentation.count("pdf_jobs.submitted")
+        future.add_done_callback(lambda f, job=job: self._finished(job))
+        return job.id
+
+    def _finished(self, job):
+        with self._lock:
+            job.finished_at = time.monotonic()
+            if job.future.exception() is None:
+                job.render_seconds = job.future.result()[1]
+                self._render_times = (self._render_times + [job.render_seconds])[-100:]
+                self._stats["completed"] += 1
+            else:
+                self._stats["failed"] += 1
+        instrumentation.count("pdf_jobs.failed" if job.future.exception() else "pdf_jobs.completed")
+        if instrumentation.is_enabled():
+            instrumentation.record_duration("pdf_jobs.turnaround", job.finished_at - job.submitted_at)
+
+    def job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job.future.done():
+                job.position = sum(
+                    1 for other in self._jobs.values()
+                    if other.sequence < job.sequence and not other.future.done()
+                )
+            return job
+
+    def metrics(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            render_times = sorted(self._render_times)
+            stats = dict(self._stats)
+        states = [job.state for job in jobs]
+        return {
+            "workers": self.workers,
+            "max_depth": self.max_depth,
+            "queued": states.count(QUEUED),
+            "running": states.count(RUNNING),
+            **stats,
+            "render_p50_s": round(render_times[len(render_times) // 2], 3) if render_times else None,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        while not self._idle.empty():
+            self._idle.get().close()
+
+
+_queue_lock = threading.Lock()
+_queue = None
+
+
+def get_render_queue(background_paths=()):
+    """Process-wide RenderQueue; ``background_paths`` are warmed when it is first created."""
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = RenderQueue(background_paths=background_paths)
+    return _queue
@@ -0,0 +1,317 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+
+PER_UNIT = "per_unit"
+PERCENT = "percent"
+
+# order matters: totals are accumulated in the same order as ring() adds rows
+CATEGORIES = (
+    "Метал",
+    "Робота ювеліра",
+    "Каміння",
+    "Профіль",
+    "Гравіювання",
+    "Покриття",
+    "Поєднання кольорів",
+)
+
+
+@dataclass(frozen=True)
+class RingConfig:
+    metal: str
+    jeweler_type: str
+    weight: float = 0.0
+    metal_discount: float = 0.0
+    jeweler_discount: float = 0.0
+    stone_type: str | None = None
+    stone_size: str | None = None
+    stone_qty: int = 0
+    profile: str | None = None
+    profile_discount: float = 0.0
+    engraving: str | None = None
+    engraving_discount: float = 0.0
+    coating: str | None = None
+    combo: float | None = None
+
+
+@dataclass(frozen=True)
+class PriceLine:
+    category: str
+    item: str
+    unit_price: float
+    qty: float
+    discount: float
+    unit: str
+    discount_type: str
+    final: float
+
+
+@dataclass(frozen=True)
+class RingQuote:
+    lines: tuple
+    total: float
+
+    def pricing_rows(self):
+        return [format_line(line) for line in self.lines]
+
+
+def line_final(unit_price, qty, discount, discount_type=PERCENT):
+    if discount_type == PER_UNIT:
+        return max(unit_price - discount, 0) * qty
+    return unit_price * qty * (1 - discount / 100)
+
+
+def format_line(line):
+    if line.discount_type == PER_UNIT:
+        discount_label = f"-{line.discount:.0f} ₴/{line.unit}"
+    else:
+        discount_label = f"{line.discount:.0f}%"
+
+    return {
+        "Категорія": line.category,
+        "Товар/послуга": line.item,
+        "Ціна": f"{line.unit_price:.0f} ₴",
+        "К-сть": f"{line.qty:.2f} {line.unit}",
+        "Знижка": discount_label,
+        "Сума": f"{line.final:.0f} ₴",
+    }
+
+
+def _line(category, item, unit_price, qty, discount, unit, discount_type=PERCENT):
+    final = line_final(unit_price, qty, discount, discount_type)
+    return PriceLine(category, item, unit_price, qty, discount, unit, discount_type, final)
+
+
+def stone_unit_price(catalog, stone_type, stone_size):
+    return float(catalog.stones[stone_size][stone_type] * catalog.usd)
+
+
+def price_ring(config, catalog):
+    lines = [
+        _line("Метал", config.metal, catalog.metals[config.metal],
+              config.weight, config.metal_discount, "г", PER_UNIT),
+        _line("Робота ювеліра", config.jeweler_type, catalog.jeweler[config.jeweler_type],
+              config.weight, config.jeweler_discount, "г"),
+    ]
+
+    if config.stone_type is not None:
+        lines.append(_line(
+            "Каміння",
+            f"{config.stone_type} {config.stone_size}мм",
+            stone_unit_price(catalog, config.stone_type, config.stone_size),
+            config.stone_qty,
+            0.0,
+            "шт",
+        ))
+    if config.profile is not None:
+        lines.append(_line("Профіль", config.profile, catalog.profiles[config.profile],
+                           1, config.profile_discount, "шт"))
+    if config.engraving is not None:
+        lines.append(_line("Гравіювання", config.engraving, catalog.engravings[config.engraving],
+                           1, config.engraving_discount, "шт"))
+    if config.coating is not None:
+        lines.append(_line("Покриття", config.coating, catalog.coatings[config.coating], 1, 0.0, "шт"))
+    if config.combo is not None:
+        lines.append(_line("Поєднання кольорів", "Додаткова послуга", config.combo, 1, 0.0, "шт"))
+
+    total = 0.0
+    for line in lines:
+        total += line.final
+
+    return RingQuote(tuple(lines), total)
+
+
+# ================= BATCH =================
+
+def _lookup(prices, keys):
+    # missing options (None) price as 0 and are masked out by the caller
+    return np.fromiter((prices[k] if k is not None else 0.0 for k in keys), float, len(keys))
+
+
+def price_arrays(
+    metal_price,
+    jeweler_price,
+    weight,
+    metal_discount=0.0,
+    jeweler_discount=0.0,
+    stone_price=0.0,
+    stone_qty=0,
+    profile_price=0.0,
+    profile_discount=0.0,
+    engraving_price=0.0,
+    engraving_discount=0.0,
+    coating_price=0.0,
+    combo=0.0,
+):
+    """Per-category finals for broadcastable arrays; absent options must be passed as 0."""
+    metal_price = np.asarray(metal_price, dtype=float)
+    weight = np.asarray(weight, dtype=float)
+
+    return {
+        "Метал": np.maximum(metal_price - metal_discount, 0) * weight,
+        "Робота ювеліра": jeweler_price * weight * (1 - np.asarray(jeweler_discount, dtype=float) / 100),
+        "Каміння": stone_price * np.asarray(stone_qty, dtype=float),
+        "Профіль": profile_price * (1 - np.asarray(profile_discount, dtype=float) / 100),
+        "Гравіювання": engraving_price * (1 - np.asarray(engraving_discount, dtype=float) / 100),
+        "Покриття": coating_price,
+        "Поєднання кольорів": combo,
+    }
+
+
+def sum_components(components):
+    total = 0.0
+    for category in CATEGORIES:
+        total = total + components[category]
+    return total
+
+
+def price_components(configs, catalog):
+    configs = list(configs)
+    n = len(configs)
+
+    def column(name, default=0.0):
+        return np.fromiter(
+            (getattr(c, name) if getattr(c, name) is not None else default for c in configs),
+            float,
+            n,
+        )
+
+    stone_price = np.fromiter(
+        (
+            stone_unit_price(catalog, c.stone_type, c.stone_size) if c.stone_type is not None else 0.0
+            for c in configs
+        ),
+        float,
+        n,
+    )
+
+    return price_arrays(
+        metal_price=_lookup(catalog.metals, [c.metal for c in configs]),
+        jeweler_price=_lookup(catalog.jeweler, [c.jeweler_type for c in configs]),
+        weight=column("weight"),
+        metal_discount=column("metal_discount"),
+        jeweler_discount=column("jeweler_discount"),
+        stone_price=stone_price,
+        stone_qty=column("stone_qty"),
+        profile_price=_lookup(catalog.profiles, [c.profile for c in configs]),
+        profile_discount=column("profile_discount"),
+        engraving_price=_lookup(catalog.engravings, [c.engraving for c in configs]),
+        engraving_discount=column("engraving_discount"),
+        coating_price=_lookup(catalog.coatings, [c.coating for c in configs]),
+        combo=column("combo"),
+    )
+
+
+def price_totals(configs, catalog):
+    return sum_components(price_components(configs, catalog))
+
+
+# ================= PRICE GRID =================
+
+@dataclass(frozen=True)
+class PriceGrid:
+    """Single-ring totals over metals x work types x weights, without discounts."""
+    metals: tuple
+    jeweler_types: tuple
+    weights: np.ndarray
+    totals: np.ndarray  # shape (metals, jeweler_types, weights)
+    metal_prices: np.ndarray
+    profile: str | None = None
+    coating: str | None = None
+
+    @property
+    def cells(self):
+        return self.totals.size
+
+
+def weight_range(start, stop, step):
+    """Weights from start to stop inclusive, rounded against float drift (0.1 * 3 != 0.3)."""
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return np.round(start + step * np.arange(max(count, 0)), 6)
+
+
+def price_grid(catalog, weights, metals=None, jeweler_types=None, profile=None, coating=None):
+    """Price every metal x work type x weight of the catalog in one numpy pass."""
+    metals = tuple(metals if metals is not None else catalog.metals)
+    jeweler_types = tuple(jeweler_types if jeweler_types is not None else catalog.jeweler)
+    weights = np.asarray(weights, dtype=float)
+    metal_prices = _lookup(catalog.metals, metals)
+
+    components = price_arrays(
+        metal_price=metal_prices[:, None, None],
+        jeweler_price=_lookup(catalog.jeweler, jeweler_types)[None, :, None],
+        weight=weights[None, None, :],
+        profile_price=catalog.profiles[profile] if profile is not None else 0.0,
+        coating_price=catalog.coatings[coating] if coating is not None else 0.0,
+    )
+    totals = np.broadcast_to(
+        sum_components(components),
+        (len(metals), len(jeweler_types), len(weights)),
+    )
+    return PriceGrid(metals, jeweler_types, weights, totals, metal_prices, profile, coating)
+
+
+# ================= VARIANTS =================
+
+@dataclass(frozen=True)
+class Variant:
+    """One option of a pair the couple wants to compare, e.g. the same rings in 750 gold."""
+    name: str
+    woman: RingConfig
+    man: RingConfig
+
+
+def price_variants(variants, catalog):
+    """Per-category finals of both rings of every variant from a single price_components() call.
+
+    Shape (variants, 2, categories): ring 0 is the woman's, categories follow CATEGORIES.
+    """
+    configs = [config for v in variants for config in (v.woman, v.man)]
+    components = price_components(configs, catalog)
+    finals = np.stack([components[category] for category in CATEGORIES], axis=-1)
+    return finals.reshape(len(variants), 2, len(CATEGORIES))
+
+
+def _option_cells(configs, describe):
+    cells = [describe(c) or "—" for c in configs]
+    return cells if any(cell != "—" for cell in cells) else None
+
+
+def comparison_rows(variants, catalog):
+    """(kind, label, one cell per variant) rows for the comparison table and PDF."""
+    variants = list(variants)
+    finals = price_variants(variants, catalog)
+    ring_totals = finals.sum(axis=-1)
+    rows = []
+
+    for ring, (title, attr) in enumerate((("Жіноча", "woman"), ("Чоловіча", "man"))):
+        configs = [getattr(v, attr) for v in variants]
+        rows.append(("section", title, [""] * len(variants)))
+        rows.append(("item", "Метал", [f"{c.metal}, {c.weight:.2f} г" for c in configs]))
+        rows.append(("item", "Тип роботи", [c.jeweler_type for c in configs]))
+        options = (
+            ("Каміння", lambda c: c.stone_type and f"{c.stone_type} {c.stone_size}мм x{c.stone_qty}"),
+            ("Профіль", lambda c: c.profile),
+            ("Гравіювання", lambda c: c.engraving),
+            ("Покриття", lambda c: c.coating),
+            ("Поєднання кольорів", lambda c: c.combo is not None and f"{c.combo:.0f} ₴"),
+        )
+        for label, describe in options:
+            cells = _option_cells(configs, describe)
+            if cells:
+                rows.append(("item", label, cells))
+        rows.append(("header", "Вартість", [""] * len(variants)))
+        for k, category in enumerate(CATEGORIES):
+            if finals[:, ring, k].any():
+                rows.append(("price", category, [f"{value:.0f} ₴" for value in finals[:, ring, k]]))
+        rows.append(("subtotal", f"{title}: разом", [f"{value:.0f} ₴" for value in ring_totals[:, ring]]))
+
+    pair_totals = ring_totals.sum(axis=-1)
+    rows.append(("total", "Загальна вартість", [f"{value:.0f} ₴" for value in pair_totals]))
+    if len(variants) > 1:
+        rows.append(("item", f"Різниця з «{variants[0].name}»", [
+            "—" if i == 0 else f"{value - pair_totals[0]:+.0f} ₴" for i, value in enumerate(pair_totals)
+        ]))
+    return rows
@@ -0,0 +1,178 @@
+"""USD → UAH exchange rates: fetched in the background, cached with a TTL, kept per date.
+
+The source is pluggable. USD_RATE_SOURCE=nbu (default) asks bank.gov.ua,
+USD_RATE_SOURCE=offline answers from the stored history, and
+USD_RATE_SOURCE=offline:41.5 always answers 41.5.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+
+from database import get_catalog, record_usd_rate, usd_rate_on
+
+NBU_URL = "https://bank.gov.ua/NBUStatService/v1/statdirectory/exchange?valcode=USD&json"
+FETCH_TIMEOUT = (3.05, 10)  # connect, read (seconds)
+FETCH_RETRIES = 3
+RATE_TTL_SECONDS = int(os.environ.get("USD_RATE_TTL", "3600"))
+
+
+class RateError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Rate:
+    date: str  # ISO date the rate is set for
+    rate: float
+    source: str
+
+
+class NbuSource:
+    name = "nbu"
+
+    def __init__(self, timeout=FETCH_TIMEOUT, retries=FETCH_RETRIES, backoff=0.5):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+
+    def fetch(self, on_date=None):
+        import requests
+
+        url = NBU_URL
+        if on_date is not None:
+            url += f"&date={on_date:%Y%m%d}"
+
+        last_error = None
+        for attempt in range(self.retries):
+            if attempt:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                response = requests.get(url, timeout=self.timeout)
+                response.raise_for_status()
+                entry = response.json()[0]
+                rate = float(entry["rate"])
+                set_for = datetime.strptime(entry["exchangedate"], "%d.%m.%Y").date()
+            except (requests.RequestException, ValueError, KeyError, IndexError, TypeError) as exc:
+                last_error = exc
+                continue
+            if rate <= 0:
+                last_error = ValueError(f"non-positive rate {rate}")
+                continue
+            return Rate(set_for.isoformat(), rate, self.name)
+
+        raise RateError(f"НБУ недоступний: {last_error}")
+
+
+class OfflineSource:
+    """Stand-in for tests and offline use: a fixed rate, or the last known one."""
+
+    name = "offline"
+
+    def __init__(self, rate=None):
+        self.rate = rate
+
+    def fetch(self, on_date=None):
+        on_date = on_date or date.today()
+        if self.rate is not None:
+            return Rate(on_date.isoformat(), float(self.rate), self.name)
+
+        stored = usd_rate_on(on_date.isoformat())
+        rate = stored[1] if stored else get_catalog().usd
+        return Rate(on_date.isoformat(), float(rate), self.name)
+
+
+def source_from_env():
+    value = os.environ.get("USD_RATE_SOURCE", "nbu").strip()
+    if value == "offline":
+        return OfflineSource()
+    if value.startswith("offline:"):
+        return OfflineSource(float(value.split(":", 1)[1]))
+    return NbuSource()
+
+
+class RateProvider:
+    def __init__(self, source=None, ttl=RATE_TTL_SECONDS):
+        self.source = source or source_from_env()
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache = {}  # on_date (None = current) -> (Rate, monotonic fetch time)
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="usd-rates")
+
+    def cached(self, on_date=None):
+        with self._lock:
+            entry = self._cache.get(on_date)
+        if entry and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def refresh(self, on_date=None, force=False):
+        """Fetch in the background and return a Future[Rate].
+
+        A fresh cached rate resolves immediately; concurrent calls for the
+        same date share one request. The current rate (``on_date=None``) is
+        also applied to settings.usd, past rates only go to the history.
+        """
+        cached = None if force else self.cached(on_date)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+
+        with self._lock:
+            pending = self._pending.get(on_date)
+            if pending is None:
+                pending = self._executor.submit(self._fetch, on_date)
+                self._pending[on_date] = pending
+            return pending
+
+    def _fetch(self, on_date):
+        try:
+            rate = self.source.fetch(on_date)
+            record_usd_rate(rate.date, rate.rate, rate.source, apply=on_date is None)
+            with self._lock:
+                self._cache[on_date] = (rate, time.monotonic())
+            return rate
+        finally:
+            with self._lock:
+                self._pending.pop(on_date, None)
+
+    def rate_on(self, on_date, timeout=FETCH_TIMEOUT[1] * FETCH_RETRIES):
+        """Rate for ``on_date``: the stored history first, the source only when it is missing."""
+        stored = usd_rate_on(on_date.isoformat())
+        if stored and stored[0] == on_date.isoformat():
+            return stored[1]
+        try:
+            return self.refresh(on_date).result(timeout).rate
+        except Exception:
+            # the closest earlier rate beats no quote at all
+            if stored:
+                return stored[1]
+            raise
+
+    def catalog_on(self, on_date, catalog=None):
+        return replace(catalog or get_catalog(), usd=self.rate_on(on_date))
+
+
+_provider_lock = threading.Lock()
+_provider = None
+
+
+def get_rate_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = RateProvider()
+    return _provider
+
+
+def set_rate_source(source):
+    """Swap the source, e.g. set_rate_source(OfflineSource(41.5)) in tests."""
+    global _provider
+    with _provider_lock:
+        _provider = RateProvider(source)
+    return _provider
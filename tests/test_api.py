@@ -0,0 +1,49 @@
+import json
+import shutil
+import socket
+import threading
+from pathlib import Path
+
+import pytest
+
+import database
+from api import MAX_BODY_BYTES, QuoteServer
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    db_path = tmp_path / "data.db"
+    shutil.copyfile(BASE_DIR / "data.db", db_path)
+    monkeypatch.setattr(database, "DB", str(db_path))
+    monkeypatch.setattr(database, "_catalog", None)
+    database.init_db()
+    server = QuoteServer(("127.0.0.1", 0), 2, 4, False)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+        database.get_manager().close()
+
+
+def post(server, content_length):
+    with socket.create_connection(("127.0.0.1", server.server_port), timeout=10) as conn:
+        conn.sendall(
+            f"POST /quote HTTP/1.1\r\nHost: test\r\nContent-Length: {content_length}\r\n\r\n{{}}".encode()
+        )
+        response = b""
+        while chunk := conn.recv(65536):
+            response += chunk
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.mark.parametrize("content_length", ["abc", "-5", str(MAX_BODY_BYTES + 1)])
+def test_bad_content_length_is_a_bad_request(server, content_length):
+    status, body = post(server, content_length)
+    assert status == 400
+    assert "error" in body
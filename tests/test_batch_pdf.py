@@ -0,0 +1,35 @@
+import json
+import shutil
+import sqlite3
+from pathlib import Path
+
+import database
+import pdf_engine
+from batch_pdf import run_batch
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_run_batch_migrates_a_fresh_database(tmp_path, monkeypatch):
+    db_path = tmp_path / "data.db"
+    shutil.copyfile(BASE_DIR / "data.db", db_path)
+    monkeypatch.setattr(database, "DB", str(db_path))
+    monkeypatch.setattr(database, "_catalog", None)
+    monkeypatch.setattr(pdf_engine, "PDF_CACHE", False)
+
+    record = {"agreement_number": "WG-1", "couple_names": "Іван та Марія"}
+    for prefix, weight in (("w", 3.2), ("m", 5.1)):
+        record.update({f"{prefix}_metal": "Золото 585", f"{prefix}_jeweler_type": "premium", f"{prefix}_weight": weight})
+    records = tmp_path / "records.jsonl"
+    records.write_text(json.dumps(record, ensure_ascii=False) + "\n", encoding="utf-8")
+
+    try:
+        summary = run_batch(records, tmp_path / "out", workers=1)
+    finally:
+        database.get_manager().close()
+
+    assert summary["failures"] == []
+    assert summary["rendered"] == 1
+    assert (tmp_path / "out" / "0000_WG-1.pdf").read_bytes().startswith(b"%PDF")
+    with sqlite3.connect(db_path) as conn:
+        assert database.schema_version(conn) == len(database.MIGRATIONS)
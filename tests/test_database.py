@@ -0,0 +1,23 @@
+from database import diff_rows
+
+
+def test_diff_rows_returns_only_changed_rows():
+    original = [("Золото 585", 2700.0), ("Золото 750", 3500.0), ("Платина 950", 1900.0)]
+    edited = [("Золото 585", 2700.0), ("Золото 750", 3600.0), ("Платина 950", 1900.0)]
+    assert diff_rows(original, edited) == (1, [(3600.0, "Золото 750")])
+
+
+def test_diff_rows_counts_cells_and_puts_the_key_last():
+    original = [("1.50", 100.0, 20.0, 5.0)]
+    edited = [("1.50", 110.0, 20.0, 6.0)]
+    assert diff_rows(original, edited) == (2, [(110.0, 20.0, 6.0, "1.50")])
+
+
+def test_diff_rows_treats_two_nans_as_equal():
+    nan = float("nan")
+    assert diff_rows([("Родій", nan)], [("Родій", nan)]) == (0, [])
+    assert diff_rows([("Родій", nan)], [("Родій", 1500.0)]) == (1, [(1500.0, "Родій")])
+
+
+def test_diff_rows_ignores_rows_with_unknown_keys():
+    assert diff_rows([("Просте", 90.0)], [("Нове", 10.0)]) == (0, [])
@@ -0,0 +1,21 @@
+import os
+import stat
+
+import pytest
+
+import pdf_engine
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_disk_cache_is_private(tmp_path, monkeypatch):
+    cache_dir = tmp_path / "pdf-cache"
+    cache_dir.mkdir(mode=0o755)
+    cache_dir.chmod(0o755)
+    monkeypatch.setattr(pdf_engine, "PDF_CACHE_DIR", cache_dir)
+
+    pdf_engine._cache_put("a" * 64, b"%PDF-1.4 test")
+
+    assert stat.S_IMODE(cache_dir.stat().st_mode) == 0o700
+    assert stat.S_IMODE((cache_dir / f"{'a' * 64}.pdf").stat().st_mode) == 0o600
+    pdf_engine.clear_pdf_cache(disk=False)
+    assert pdf_engine._cache_get("a" * 64) == b"%PDF-1.4 test"
@@ -0,0 +1,50 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+import database
+import instrumentation
+import pdf_jobs
+from batch_pdf import build_payload
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+@pytest.fixture
+def payload(tmp_path, monkeypatch):
+    db_path = tmp_path / "data.db"
+    shutil.copyfile(BASE_DIR / "data.db", db_path)
+    monkeypatch.setattr(database, "DB", str(db_path))
+    monkeypatch.setattr(database, "_catalog", None)
+    database.init_db()
+    try:
+        record = {"agreement_number": "WG-1"}
+        for prefix in ("w", "m"):
+            record.update({f"{prefix}_metal": "Золото 585", f"{prefix}_jeweler_type": "premium", f"{prefix}_weight": 3})
+        yield build_payload(record, database.get_catalog())
+    finally:
+        database.get_manager().close()
+
+
+@pytest.fixture
+def instrumented():
+    instrumentation.reset()
+    instrumentation.set_enabled(True)
+    yield
+    instrumentation.set_enabled(False)
+    instrumentation.reset()
+
+
+def test_worker_spans_reach_the_parent(payload, instrumented, monkeypatch):
+    # a cache hit in the worker would skip the render and its spans
+    monkeypatch.setenv("PDF_CACHE", "0")
+    queue = pdf_jobs.RenderQueue(workers=1)
+    try:
+        job = queue.job(queue.submit(payload))
+        assert job.future.result(timeout=60)[0].startswith(b"%PDF")
+    finally:
+        queue.shutdown()
+
+    spans = {s["span"] for s in instrumentation.stats()["spans"]}
+    assert {"pdf.build", "pdf_jobs.turnaround"} <= spans
@@ -0,0 +1,98 @@
+"""pricing.py must reproduce the original add_row() arithmetic bit for bit."""
+from types import MappingProxyType
+
+import numpy as np
+import pytest
+
+from database import Catalog
+from pricing import RingConfig, price_grid, price_ring, price_totals
+
+
+def make_catalog():
+    def prices(values):
+        return MappingProxyType(dict(values))
+
+    return Catalog(
+        version=1,
+        metals=prices({"Золото 585": 2713.37, "Золото 750": 3519.9, "Платина 950": 1897.15}),
+        jeweler=prices({"platinum": 1234.56, "premium": 1811.1}),
+        stones=MappingProxyType({
+            "1.50": prices({"diamond": 187.3, "moissanite": 21.7}),
+            "2.00": prices({"diamond": 411.9, "moissanite": 33.3}),
+        }),
+        profiles=prices({"Comfort fit": 1349.99, "Стандартний": 0.0}),
+        engravings=prices({"Просте": 90.1, "Складне": 777.7}),
+        coatings=prices({"Родій": 1500.45}),
+        usd=41.4213,
+        background_file="full_white.png",
+        text_color="#000000",
+    )
+
+
+def add_row(unit_price, qty, discount, discount_type="percent"):
+    # the arithmetic of add_row() in ring() before pricing.py existed
+    base = unit_price * qty
+    if discount_type == "per_unit":
+        discounted_unit_price = max(unit_price - discount, 0)
+        return discounted_unit_price * qty
+    return base * (1 - discount / 100)
+
+
+def baseline_total(config, catalog):
+    total = 0.0
+    total += add_row(catalog.metals[config.metal], config.weight, config.metal_discount, "per_unit")
+    total += add_row(catalog.jeweler[config.jeweler_type], config.weight, config.jeweler_discount)
+    if config.stone_type is not None:
+        stone_price = float(catalog.stones[config.stone_size][config.stone_type] * catalog.usd)
+        total += add_row(stone_price, config.stone_qty, 0.0)
+    if config.profile is not None:
+        total += add_row(catalog.profiles[config.profile], 1, config.profile_discount)
+    if config.engraving is not None:
+        total += add_row(catalog.engravings[config.engraving], 1, config.engraving_discount)
+    if config.coating is not None:
+        total += add_row(catalog.coatings[config.coating], 1, 0.0)
+    if config.combo is not None:
+        total += add_row(config.combo, 1, 0.0)
+    return total
+
+
+CONFIGS = [
+    RingConfig("Золото 585", "platinum"),
+    RingConfig("Золото 585", "platinum", weight=3.37, metal_discount=12.5, jeweler_discount=7.3),
+    RingConfig("Золото 750", "premium", weight=5.1, metal_discount=5000),  # discount above the price
+    RingConfig(
+        "Платина 950", "premium", weight=4.44, metal_discount=3, jeweler_discount=15,
+        stone_type="diamond", stone_size="1.50", stone_qty=7,
+        profile="Comfort fit", profile_discount=10,
+        engraving="Складне", engraving_discount=33.3,
+        coating="Родій", combo=512.75,
+    ),
+    RingConfig("Золото 750", "platinum", weight=0.1, stone_type="moissanite", stone_size="2.00", stone_qty=0,
+               engraving="Просте", combo=0.0),
+]
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+def test_price_ring_matches_add_row(config):
+    catalog = make_catalog()
+    assert price_ring(config, catalog).total == baseline_total(config, catalog)
+
+
+def test_price_totals_match_add_row():
+    catalog = make_catalog()
+    totals = price_totals(CONFIGS, catalog)
+    assert totals.tolist() == [baseline_total(config, catalog) for config in CONFIGS]
+
+
+@pytest.mark.parametrize("profile, coating", [(None, None), ("Comfort fit", "Родій")])
+def test_price_grid_matches_add_row(profile, coating):
+    catalog = make_catalog()
+    weights = np.array([0.1, 1.0, 3.37, 7.25])
+    grid = price_grid(catalog, weights, profile=profile, coating=coating)
+
+    assert grid.totals.shape == (len(catalog.metals), len(catalog.jeweler), len(weights))
+    for i, metal in enumerate(grid.metals):
+        for j, jeweler_type in enumerate(grid.jeweler_types):
+            for k, weight in enumerate(weights.tolist()):
+                config = RingConfig(metal, jeweler_type, weight=weight, profile=profile, coating=coating)
+                assert grid.totals[i, j, k] == baseline_total(config, catalog)